@@ -0,0 +1,51 @@
+"""Benchmark solver throughput on the geometries of the validation studies."""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from run_suite import load_studies, ROOTDIR
+from vspaero_tools import benchmark, runlog, study
+
+# Constant-chord wing of the valcs_1 tessellation studies
+sys.path.append(os.path.join(ROOTDIR, "valcs_1"))
+from validation_cs_1_case import CASE as VALCS_1_CASE
+
+RESULTS_PATH = os.path.join(ROOTDIR, benchmark.RESULTS_FILE)
+OUTPUTDIR = os.path.join(ROOTDIR, study.OUTPUT_DIR)
+
+
+def benchmark_cases():
+    """Return the valcs_1 wing, the valcs_4 wing and the valcs_6 family."""
+    case_dict = {"valcs_1": VALCS_1_CASE}
+    for valcs_study in load_studies(
+            os.path.join(ROOTDIR, "valcs_[46]", "valcs_*_lift_curve.py")):
+        for case in valcs_study.cases:
+            case_dict["{0}/{1}".format(valcs_study.name, case.name)] = case
+
+    return case_dict
+
+
+if __name__ == "__main__":
+    # With a commit as argument, the new results are compared with the
+    # latest ones measured on it, if any; --scripts also times the cases
+    # as concurrent vsp processes
+    argument_list = [arg for arg in sys.argv[1:] if arg != "--scripts"]
+    baseline_list = []
+    if argument_list and os.path.isfile(RESULTS_PATH):
+        baseline_list = runlog.read_log(RESULTS_PATH,
+                                        commit=argument_list[0])
+
+    backends = (benchmark.BACKENDS if "--scripts" in sys.argv[1:]
+                else (benchmark.API_BACKEND,))
+    entry_list = benchmark.run(benchmark_cases(), OUTPUTDIR,
+                               results_path=RESULTS_PATH, backends=backends)
+    for entry in entry_list:
+        print("{0} ({1}) {2}x{3} tess, {4} workers: {5:.1f} cases/h, "
+              "{6:.1f} s latency".format(
+                  entry["geometry"], entry["backend"],
+                  entry["chordwise_tess"], entry["spanwise_tess"],
+                  entry["workers"], entry["cases_per_hour"],
+                  entry["latency_mean"]))
+
+    for key, ratio in benchmark.compare(baseline_list, entry_list).items():
+        print(key, "{0:.2f}x baseline throughput".format(ratio))
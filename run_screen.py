@@ -0,0 +1,43 @@
+"""Screen the planform studies with the surrogate, solving uncertain cases."""
+import dataclasses
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from run_suite import load_studies, ROOTDIR
+from vspaero_tools import surrogate
+
+STUDY_SCRIPTS = os.path.join(ROOTDIR, "valcs_[567]", "valcs_*_lift_curve.py")
+STUDYDIR = ROOTDIR
+TOLERANCE = 0.005
+
+
+def screen_cases():
+    """Return the twist, aspect ratio and taper cases of valcs_5, 6 and 7.
+
+    Cases are renamed after their study, as several studies reuse names.
+    """
+    case_list = []
+    for valcs_study in load_studies(STUDY_SCRIPTS):
+        for case in valcs_study.cases:
+            case_list.append(dataclasses.replace(
+                case, name="{0}-{1}".format(valcs_study.name, case.name)))
+
+    return case_list
+
+
+if __name__ == "__main__":
+    # An optional argument overrides the standard deviation tolerance
+    tolerance = float(sys.argv[1]) if len(sys.argv) > 1 else TOLERANCE
+
+    model = surrogate.Surrogate()
+    count = model.update()
+    print("Trained on {0} archived cases in {1} partitions".format(
+        count, len(model.partitions)))
+
+    case_list = screen_cases()
+    result_list = surrogate.screen(model, case_list, tolerance, STUDYDIR)
+    for case, result in zip(case_list, result_list):
+        print("{0}: {1}, max CL std {2:.2g}".format(
+            case.name, "solved" if result["solved"] else "predicted",
+            result["CL_std"].max()))
@@ -0,0 +1,37 @@
+"""Run every declarative validation study in one scheduling pass."""
+import glob
+import importlib.util
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from vspaero_tools import jobqueue, study
+
+ROOTDIR = os.path.dirname(os.path.abspath(__file__))
+STUDY_SCRIPTS = os.path.join(ROOTDIR, "valcs_*", "valcs_*.py")
+
+
+def load_studies(pattern=STUDY_SCRIPTS):
+    """Import every study script matching `pattern` and return its STUDY."""
+    study_list = []
+    for path in sorted(glob.glob(pattern)):
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if hasattr(module, "STUDY"):
+            study_list.append(module.STUDY)
+
+    return study_list
+
+
+if __name__ == "__main__":
+    # --force re-solves and re-reports every study regardless of its inputs;
+    # --queue runs the sweeps from a resumable job queue, printing every
+    # attempt
+    metric_dict = study.run_suite(load_studies(),
+                                  force="--force" in sys.argv[1:],
+                                  use_queue="--queue" in sys.argv[1:],
+                                  progress=jobqueue.print_progress)
+    for study_name, metrics in metric_dict.items():
+        print(study_name, metrics)
@@ -0,0 +1,36 @@
+"""Wing and flow of VSPAERO validation test 2, shared by its studies."""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import study, vspscript
+
+FNAME = "validation_2.vsp3"
+
+# Wing geometry
+span = 10
+chord = 1
+sweep = 35
+tcrat = 0.09
+
+# Flow conditions
+alpha_i = 9
+alpha_f = 10
+alpha_npts = 2
+
+v_inf = 168.8
+a = 1116.45
+mach = v_inf/a
+
+wing = study.Wing(parms=(("TotalSpan", "WingGeom", span),
+                         ("Root_Chord", "XSec_1", chord),
+                         ("Tip_Chord", "XSec_1", chord),
+                         ("Sweep", "XSec_1", sweep),
+                         ("ThickChord", "XSecCurve_0", tcrat),
+                         ("ThickChord", "XSecCurve_1", tcrat)))
+sweep_input = vspscript.SweepInput(FNAME, alpha_i, alpha_f, alpha_npts,
+                                   mach=mach)
+
+# The wing at the default tessellation, as solved by the benchmark
+CASE = study.Case("valcs_1", wing, sweep_input,
+                  study.Mesh(le_clstr=None, te_clstr=None))
@@ -1,56 +1,33 @@
 """Run VSPAERO validation test 2."""
 import openvsp as vsp
 import os
-import subprocess
-import time
+import sys
 
 import numpy as np
-import matplotlib.pylab as plt
-import seaborn as sns
-
-DPI = 300
-PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
-           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
-MARKERS = ["o", "^", "s", "P", "d"]
-LEGEND_FONTSIZE = "small"
-GRAPHICS_DIR = "graphics"
-sns.set_theme(style="whitegrid", font="Times New Roman",
-              context="paper", palette=PALETTE)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import (api, cache, convergence, geometry, polar, runner,
+                           study)
+from vspaero_tools.plotting import DPI, GRAPHICS_DIR, MARKERS, PALETTE, pyplot
+from validation_cs_1_case import FNAME, sweep, sweep_input, wing
 
 # %% File system
 
 OUTPUTDIR = "output"
-VSPSCRIPT = "runVSPAEROSweep.vspscript"
-FNAME = "validation_2.vsp3"
-FDIR = os.path.join(OUTPUTDIR, FNAME)
-VSPAERODIR = os.path.join(OUTPUTDIR, VSPSCRIPT)
+CHECKPOINT = os.path.join(OUTPUTDIR, "checkpoint-chordwise.jsonl")
 
 
 # %% User input
 
-# Wing geometry
-span = 10
-chord = 1
-sweep = 35
-tcrat = 0.09
-
 # Mesh parameters
 chordwise_tess_array = np.arange(5.0, 137.0, 8.0)
+conv_tol = 0.005
 spanwise_tess = 6
 root_clstr = 1
 tip_clstr = 0.5
 le_clstr = 0.25
 te_clstr = 0.25
 
-# Flow conditions
-alpha_i = 9
-alpha_f = 10
-alpha_npts = 2
-
-v_inf = 168.8
-a = 1116.45
-mach = v_inf/a
-
 # Known results
 prcnt_error = 0.05
 
@@ -71,81 +48,59 @@ else:
     SURFACES_CDi = 0.0166
 
 
-# %% Create OpenVSP file
-
-vsp.ClearVSPModel()
-
-# Add wing
-wing_id = vsp.AddGeom("WING")
-
-# Modify wing
-vsp.SetParmValUpdate(wing_id, "TotalSpan", "WingGeom", span)
-vsp.SetParmValUpdate(wing_id, "Root_Chord", "XSec_1", chord)
-vsp.SetParmValUpdate(wing_id, "Tip_Chord", "XSec_1", chord)
-vsp.SetParmValUpdate(wing_id, "Sweep", "XSec_1", sweep)
-vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_0", tcrat)
-vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_1", tcrat)
-
-# Modifiy mesh
-# vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tes)
-vsp.SetParmValUpdate(wing_id, "SectTess_U", "XSec_1", spanwise_tess)
-vsp.SetParmValUpdate(wing_id, "InCluster", "XSec_1", root_clstr)
-vsp.SetParmValUpdate(wing_id, "OutCluster", "XSec_1", tip_clstr)
-vsp.Update()
-
-vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-vsp.Update()
-
+# %% Define OpenVSP geometry
 
-# %%Define funxtion to set analysis parameters
-
-
-def setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach):
-    with open(VSPAERODIR) as file_object:
-        vspscriptlines = file_object.readlines()
-    vspscriptlines[47] = "    double alpha_i = {0};\n".format(alpha_i)
-    vspscriptlines[52] = "    double alpha_f = {0};\n".format(alpha_f)
-    vspscriptlines[57] = "    double alpha_npts = {0};\n".format(alpha_npts)
-    vspscriptlines[62] = "    double mach_i = {0:.2f};\n".format(mach)
-
-    with open(VSPAERODIR, "w") as file_object:
-        file_object.writelines(vspscriptlines)
+# The live model only changes its tessellation from one level to the next
+session = geometry.Session()
 
 
 # %% Chordwise tesselation sensitivity analysis
 
-setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach)
-
-CL_list = []
-dCLdalpha_list = []
-CDi_list = []
-time_exec_list = []
-for chordwise_tess in chordwise_tess_array:
-    vsp.ClearVSPModel()
-    vsp.ReadVSPFile(FDIR)
-
-    vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tess)
-
-    vsp.Update()
-
-    vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-    vsp.Update()
-
-    start = time.time()
-    subprocess.run(["vsp", "-script", VSPSCRIPT], shell=True, cwd=OUTPUTDIR)
-    end = time.time()
-
-    polar_array = np.loadtxt(
-        os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.polar"), skiprows=1)
-    CL_list.append(polar_array[1, 4])
-    dCLdalpha_list.append(polar_array[1, 4] - polar_array[0, 4])
-    CDi_list.append(polar_array[1, 6])
-    time_exec_list.append(end - start)
-
-dCLdalpha_list = np.array(dCLdalpha_list)*180/np.pi
+def solve_chordwise(chordwise_tess):
+    """Solve one chordwise tessellation and return its coefficients."""
+    mesh = study.Mesh(chordwise_tess, spanwise_tess, root_clstr, tip_clstr,
+                      None, None)
+    session.apply(study.Case(FNAME, wing, sweep_input, mesh))
+
+    casedir = runner.case_dir(
+        OUTPUTDIR, "chordwise_tess-{0:g}".format(chordwise_tess),
+        sweep_input)
+    session.write(os.path.join(casedir, FNAME))
+    # The session already holds the model, so it is solved without a reread
+    api.run_case(casedir, sweep_input, tags={
+        "openvsp": vsp.GetVSPVersion(), "chordwise_tess": chordwise_tess},
+        reread=False)
+
+    polar_dict = polar.read_polar(
+        os.path.join(casedir, FNAME[:-5] + "_DegenGeom.polar"))
+
+    return {"CL": polar_dict["CL"][1],
+            "dCLdalpha": (polar_dict["CL"][1] - polar_dict["CL"][0])*180/np.pi,
+            "CDi": polar_dict["CDi"][1]}
+
+
+# Finer meshes are only solved until CL, CLalpha and CDi converge. Every
+# solved level is checkpointed, so a rerun after a crash resumes at the first
+# unsolved one; the fingerprint covers every input but the swept tessellation
+fingerprint = cache.key(
+    study.Case(FNAME, wing, sweep_input, study.Mesh(
+        None, spanwise_tess, root_clstr, tip_clstr, None, None)).parms(),
+    sweep_input, vsp.GetVSPVersion())
+convergence_result = convergence.converge(
+    solve_chordwise, chordwise_tess_array, tolerance=conv_tol,
+    checkpoint=CHECKPOINT, fingerprint=fingerprint)
+chordwise_tess_array = convergence_result.levels
+time_exec_list = convergence_result.times
+CL_list = convergence_result.values["CL"]
+dCLdalpha_list = convergence_result.values["dCLdalpha"]
+CDi_list = convergence_result.values["CDi"]
+
+for coefficient, value in convergence_result.extrapolated.items():
+    print("{0} extrapolated: {1:.5f}".format(coefficient, value))
 
 # %% Plot results
 
+plt = pyplot()
 fig, axes = plt.subplots(4, sharex=True, dpi=DPI)
 ax1 = axes[0]
 ax2 = axes[1]
@@ -1,28 +1,18 @@
 """Run VSPAERO validation test 2."""
-import openvsp as vsp
 import os
-import subprocess
+import sys
 
 import numpy as np
-import matplotlib.pylab as plt
-import seaborn as sns
-
-DPI = 300
-PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
-           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
-MARKERS = ["o", "^", "s", "P", "d"]
-LEGEND_FONTSIZE = "small"
-GRAPHICS_DIR = "graphics"
-sns.set_theme(style="whitegrid", font="Times New Roman",
-              context="paper", palette=PALETTE)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import metrics, polar, study, vspscript
+from vspaero_tools.plotting import (DPI, GRAPHICS_DIR, LEGEND_FONTSIZE,
+                                    MARKERS, PALETTE, pyplot)
 
 # %% File system
 
-OUTPUTDIR = "output"
-VSPSCRIPT = "runVSPAEROSweep.vspscript"
+STUDYDIR = os.path.dirname(os.path.abspath(__file__))
 FNAME = "valcs_2.vsp3"
-FDIR = os.path.join(OUTPUTDIR, FNAME)
-VSPAERODIR = os.path.join(OUTPUTDIR, VSPSCRIPT)
 
 
 # %% User input
@@ -59,118 +49,102 @@ knowndCMdalpha_list = [-3.10, -3.139]  # , -3.174, -3.152, -3.139]
 # , "SURFACES 6x16", "SURFACES 8x24", "SURFACES 16x36"]
 knownlabel_list = [r"$\mathdefault{Published~Data~\pm 5\%}$", "SURFACES"]
 
-# %% Create OpenVSP file
-
-vsp.ClearVSPModel()
-
-# Add wing
-wing_id = vsp.AddGeom("WING")
-
-# Modify wing
-vsp.SetParmValUpdate(wing_id, "TotalSpan", "WingGeom", span)
-vsp.SetParmValUpdate(wing_id, "Root_Chord", "XSec_1", root_chord)
-vsp.SetParmValUpdate(wing_id, "Tip_Chord", "XSec_1", tip_chord)
-vsp.SetParmValUpdate(wing_id, "Sweep", "XSec_1", sweep)
-
-# Modifiy mesh
-vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tess)
-vsp.SetParmValUpdate(wing_id, "SectTess_U", "XSec_1", spanwise_tess)
-vsp.SetParmValUpdate(wing_id, "InCluster", "XSec_1", root_clstr)
-vsp.SetParmValUpdate(wing_id, "OutCluster", "XSec_1", tip_clstr)
-vsp.SetParmValUpdate(wing_id, "LECluster", "WingGeom", le_clstr)
-vsp.SetParmValUpdate(wing_id, "TECluster", "WingGeom", te_clstr)
-vsp.Update()
-
-vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-vsp.Update()
-
-
-# %%Define funxtion to set analysis parameters
-
-
-def setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach):
-    with open(VSPAERODIR) as file_object:
-        vspscriptlines = file_object.readlines()
-    vspscriptlines[10] = '	  string fname = "{0}";\n'.format(FNAME)
-    vspscriptlines[47] = "    double alpha_i = {0};\n".format(alpha_i)
-    vspscriptlines[52] = "    double alpha_f = {0};\n".format(alpha_f)
-    vspscriptlines[57] = "    double alpha_npts = {0};\n".format(alpha_npts)
-    vspscriptlines[62] = "    double mach_i = {0:.2f};\n".format(mach)
-
-    with open(VSPAERODIR, "w") as file_object:
-        file_object.writelines(vspscriptlines)
 
+# %% Report
 
-# %% Chordwise tesselation sensitivity analysis
+def plot_curves(valcs_study, results):
+    """Plot the lift and moment curves against the reference slopes."""
+    plt = pyplot()
+    reference = valcs_study.reference
+    CL_array = results["valcs_2"]["polar/CL"]
+    CM_array = results["valcs_2"]["polar/CMy"]
 
-setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach)
+    fig, axes = plt.subplots(2, sharex=True, dpi=DPI)
+    ax1 = axes[0]
+    ax2 = axes[1]
 
-vsp.ClearVSPModel()
-vsp.ReadVSPFile(FDIR)
-vsp.Update()
+    ax2.set_xlabel("Angle of Attack, °")
 
-subprocess.run(["vsp", "-script", VSPSCRIPT], shell=True, cwd=OUTPUTDIR)
+    ax1.set_ylabel(r"$\mathdefault{C_{L}}$")
+    ax2.set_ylabel(r"$\mathdefault{C_{M}}$")
 
-polar_array = np.loadtxt(
-    os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.polar"), skiprows=1)
+    ax1.plot(alpha_array, CL_array, marker=MARKERS[0], label="VSPAERO")
+    ax2.plot(alpha_array, CM_array, marker=MARKERS[0], label="VSPAERO")
+    for i, knownlabel in enumerate(reference["label"]):
+        knownCL_array = reference["dCLdalpha"][i]*np.pi/180*alpha_array
+        ax1.plot(alpha_array, knownCL_array, linestyle="dashed",
+                 label=knownlabel, color=PALETTE[i+1])
 
-CL_array = polar_array[:, 4]
-CM_array = polar_array[:, 18]
+        knownCM_array = reference["dCMdalpha"][i]*np.pi/180*alpha_array
+        ax2.plot(alpha_array, knownCM_array, linestyle="dashed",
+                 label=knownlabel, color=PALETTE[i+1])
 
+        if not i:
+            ax1.fill_between(alpha_array, knownCL_array*(1 + prcnt_error),
+                             knownCL_array*(1 - prcnt_error), alpha=0.25,
+                             color=PALETTE[i+1])
+            ax2.fill_between(alpha_array, knownCM_array*(1 + prcnt_error),
+                             knownCM_array*(1 - prcnt_error), alpha=0.25,
+                             color=PALETTE[i+1])
 
-# %% Plot results
+    ax1.set_xlim(left=0)
+    ax1.set_ylim(bottom=0)
+    ax2.set_ylim(top=0, bottom=-0.6)
 
-fig, axes = plt.subplots(2, sharex=True, dpi=DPI)
-ax1 = axes[0]
-ax2 = axes[1]
+    ax1.legend(fontsize=LEGEND_FONTSIZE)
 
-ax2.set_xlabel("Angle of Attack, °")
+    fig.align_ylabels()
 
-ax1.set_ylabel(r"$\mathdefault{C_{L}}$")
-ax2.set_ylabel(r"$\mathdefault{C_{M}}$")
+    return fig
 
-ax1.plot(alpha_array, CL_array, marker=MARKERS[0], label="VSPAERO")
-ax2.plot(alpha_array, CM_array, marker=MARKERS[0], label="VSPAERO")
-for i, knownlabel in enumerate(knownlabel_list):
-    knownCL_array = knowndCLdalpha_list[i]*np.pi/180*alpha_array
-    ax1.plot(alpha_array, knownCL_array, linestyle="dashed",
-             label=knownlabel, color=PALETTE[i+1])
 
-    knownCM_array = knowndCMdalpha_list[i]*np.pi/180*alpha_array
-    ax2.plot(alpha_array, knownCM_array, linestyle="dashed",
-             label=knownlabel, color=PALETTE[i+1])
+def report(valcs_study, casedir_dict):
+    """Return the lift and moment slope errors."""
+    reference = valcs_study.reference
+    polar_dict = polar.read_polar(
+        os.path.join(casedir_dict["valcs_2"], FNAME[:-5] + "_DegenGeom.polar"))
 
-    if not i:
-        ax1.fill_between(alpha_array, knownCL_array*(1 + prcnt_error),
-                     knownCL_array*(1 - prcnt_error), alpha=0.25, color=PALETTE[i+1])
-        ax2.fill_between(alpha_array, knownCM_array*(1 + prcnt_error),
-                  knownCM_array*(1 - prcnt_error), alpha=0.25, color=PALETTE[i+1])
-    else:
-        pass
+    CL_array = polar_dict["CL"]
+    CM_array = polar_dict["CMy"]
 
+    # Error calculation
+    dCLdalpha_error = metrics.percent_error(
+        metrics.lift_slope(alpha_array, CL_array),
+        reference["dCLdalpha"][0])
+    print(round(dCLdalpha_error, 2))
 
+    print("")
 
-ax1.set_xlim(left=0)
-ax1.set_ylim(bottom=0)
-ax2.set_ylim(top=0, bottom=-0.6)
+    dCMdalpha_error = metrics.percent_error(
+        metrics.slope(np.radians(alpha_array), CM_array),
+        reference["dCMdalpha"][0])
+    print(round(dCMdalpha_error, 2))
 
-ax1.legend(fontsize=LEGEND_FONTSIZE)
+    return {"dCLdalpha_error": dCLdalpha_error,
+            "dCMdalpha_error": dCMdalpha_error}
 
-fig.align_ylabels()
 
-fig.savefig(os.path.join(GRAPHICS_DIR, "lift_and_moment_curve.pdf".format(sweep)),
-            format="pdf", bbox_inches="tight")
+# %% Study definition
 
-# %% Error calculation
+wing = study.Wing(parms=(("TotalSpan", "WingGeom", span),
+                         ("Root_Chord", "XSec_1", root_chord),
+                         ("Tip_Chord", "XSec_1", tip_chord),
+                         ("Sweep", "XSec_1", sweep)))
+mesh = study.Mesh(chordwise_tess, spanwise_tess, root_clstr, tip_clstr,
+                  le_clstr, te_clstr)
+sweep_input = vspscript.SweepInput(
+    FNAME, alpha_i, alpha_f, alpha_npts, mach=mach)
 
-dCLdalpha_array = (CL_array[1:] - CL_array[:-1])*180/np.pi
-dCLdalpha_ave = np.mean(dCLdalpha_array)
-dCLdalpha_error = np.abs((dCLdalpha_ave - knowndCLdalpha_list[0])/knowndCLdalpha_list[0] * 100)
-print(round(dCLdalpha_error, 2))
+STUDY = study.Study(
+    "valcs_2", STUDYDIR, [study.Case("valcs_2", wing, sweep_input, mesh)],
+    reference={"dCLdalpha": knowndCLdalpha_list,
+               "dCMdalpha": knowndCMdalpha_list,
+               "label": knownlabel_list},
+    report=report,
+    figures=(study.Figure(
+        os.path.join(GRAPHICS_DIR, "lift_and_moment_curve.pdf"),
+        plot_curves),))
 
-print("")
 
-dCMdalpha_array = (CM_array[1:] - CM_array[:-1])*180/np.pi
-dCMdalpha_ave = np.mean(dCMdalpha_array)
-dCMdalpha_error = np.abs((dCMdalpha_ave - knowndCMdalpha_list[0])/knowndCMdalpha_list[0] * 100)
-print(round(dCMdalpha_error, 2))
+if __name__ == "__main__":
+    study.run_suite([STUDY])
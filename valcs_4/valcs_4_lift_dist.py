@@ -1,31 +1,18 @@
 """Run VSPAERO validation test 9."""
-import openvsp as vsp
 import os
-import subprocess
+import sys
 
 import numpy as np
-import matplotlib.pylab as plt
-import seaborn as sns
 
-from scipy import interpolate
-
-DPI = 300
-PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
-           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
-MARKERS = ["o", "^", "s", "P", "d"]
-LEGEND_FONTSIZE = "small"
-
-GRAPHICS_DIR = "graphics"
-sns.set_theme(style="whitegrid", font="Times New Roman",
-              context="paper", palette=PALETTE)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import catalog, lod, metrics, polar, study, vspscript
+from vspaero_tools.plotting import (DPI, GRAPHICS_DIR, MARKERS, PALETTE,
+                                    pyplot)
 
 # %% File system
 
-OUTPUTDIR = "output"
-VSPSCRIPT = "runVSPAEROSweep.vspscript"
+STUDYDIR = os.path.dirname(os.path.abspath(__file__))
 FNAME = "valcs_4.vsp3"
-FDIR = os.path.join(OUTPUTDIR, FNAME)
-VSPAERODIR = os.path.join(OUTPUTDIR, VSPSCRIPT)
 
 
 # %% User input
@@ -58,123 +45,86 @@ alpha_array = np.linspace(alpha_i, alpha_f, alpha_npts)
 # Known results
 prcnt_error = 0.05
 
-expyloc_array = np.array(
-    [0.001, 0.03, 0.101, 0.301, 0.547, 0.748, 0.899, 0.96])
-excldist_array = np.array(
-    [1.057, 1.073, 1.156, 1.149, 1.067, 0.908, 0.765, 0.584])
-
-
-# %% Create OpenVSP file
-
-vsp.ClearVSPModel()
-
-# Add wing
-wing_id = vsp.AddGeom("WING")
-
-# Modify wing
-vsp.SetParmValUpdate(wing_id, "Span", "XSec_1", midspan)
-vsp.SetParmValUpdate(wing_id, "Root_Chord", "XSec_1", root_chord)
-vsp.SetParmValUpdate(wing_id, "Tip_Chord", "XSec_1", tip_chord)
-vsp.SetParmValUpdate(wing_id, "Sweep_Location", "XSec_1", sweep_loc)
-vsp.SetParmValUpdate(wing_id, "Sweep", "XSec_1", sweep)
-
-xsec_surf = vsp.GetXSecSurf(wing_id, 0)
-vsp.ChangeXSecShape(xsec_surf, 0, vsp.XS_SIX_SERIES)
-vsp.ChangeXSecShape(xsec_surf, 1, vsp.XS_SIX_SERIES)
-vsp.Update()
-vsp.SetParmValUpdate(wing_id, "Series", "XSecCurve_0", series)
-vsp.SetParmValUpdate(wing_id, "Series", "XSecCurve_1", series)
-vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_0", tc_rat)
-vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_1", tc_rat)
-
-# Modifiy mesh
-vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tess)
-vsp.SetParmValUpdate(wing_id, "SectTess_U", "XSec_1", spanwise_tess)
-vsp.SetParmValUpdate(wing_id, "InCluster", "XSec_1", root_clstr)
-vsp.SetParmValUpdate(wing_id, "OutCluster", "XSec_1", tip_clstr)
-vsp.SetParmValUpdate(wing_id, "LECluster", "WingGeom", le_clstr)
-vsp.SetParmValUpdate(wing_id, "TECluster", "WingGeom", te_clstr)
-vsp.Update()
-
-vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-vsp.Update()
-
-
-# %%Define funxtion to set analysis parameters
-
-
-def setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach=0.0, x_cg=0.0, y_cg=0.0, z_cg=0.0):
-    with open(VSPAERODIR) as file_object:
-        vspscriptlines = file_object.readlines()
-    vspscriptlines[10] = '	  string fname = "{0}";\n'.format(FNAME)
-    vspscriptlines[47] = "    double alpha_i = {0};\n".format(alpha_i)
-    vspscriptlines[52] = "    double alpha_f = {0};\n".format(alpha_f)
-    vspscriptlines[57] = "    double alpha_npts = {0};\n".format(alpha_npts)
-    vspscriptlines[62] = "    double mach_i = {0:.2f};\n".format(mach)
-
-    vspscriptlines[68] = "    double x_cg = {0:.2f};\n".format(x_cg)
-    vspscriptlines[73] = "    double y_cg = {0:.2f};\n".format(y_cg)
-    vspscriptlines[78] = "    double z_cg = {0:.2f};\n".format(z_cg)
-
-    with open(VSPAERODIR, "w") as file_object:
-        file_object.writelines(vspscriptlines)
-
-
-# %% Chordwise tesselation sensitivity analysis
-
-setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts)
-
-vsp.ClearVSPModel()
-vsp.ReadVSPFile(FDIR)
-vsp.Update()
-
-subprocess.run(["vsp", "-script", VSPSCRIPT], shell=True, cwd=OUTPUTDIR)
-
-
-# %% Extract load distribution data
-
-loaddist_array = np.loadtxt(
-    os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.lod"), skiprows=19,
-    max_rows=spanwise_tess-1)
-
-refgeom_array = np.loadtxt(
-    os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.lod"), skiprows=3,
-    max_rows=14, usecols=1)
-
-polar_array = np.loadtxt(
-    os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.polar"), skiprows=1)
-
-cldist_vsp = loaddist_array[:, 7]
-yloc_array = loaddist_array[:, 1]
-chord_array = loaddist_array[:, 5]
-cref = refgeom_array[1]
-CL = polar_array[4]
-newcldist = cldist_vsp*chord_array/(cref*CL)
-
-
-# %% Plot results
-
-fig, ax1 = plt.subplots(1, sharex=True, dpi=DPI)
-ax1.plot(yloc_array, newcldist, label="VSPAERO")
-ax1.plot(expyloc_array, excldist_array, linestyle="None",
-         color=PALETTE[1], marker=MARKERS[1], alpha=0.5, label="Experimental")
-# ax1.fill_between(expyloc_array, excldist_array*(1 + prcnt_error),
-#                  excldist_array*(1 - prcnt_error), alpha=0.25,
-#                  color=PALETTE[1])
-ax1.set_xlim(left=0)
-ax1.set_ylim(bottom=0)
-ax1.set_xlabel("Normalized Span")
-ax1.set_ylabel("Normalized Lift Coefficient")
-ax1.legend()
-
-fig.savefig(os.path.join(GRAPHICS_DIR, "lift_dist.pdf"), format="pdf",
-            bbox_inches="tight")
-
-# %% Error calculation
-
-cLfromyloc = interpolate.interp1d(
-    expyloc_array, excldist_array, fill_value="extrapolate")
-expcL4error = cLfromyloc(yloc_array)
 
-cLdist_error = np.mean(np.abs((newcldist - expcL4error)/expcL4error) * 100)
-print(cLdist_error)
+# %% Report
+
+def plot_lift_dist(valcs_study, results):
+    """Plot the normalized lift distribution against the experiment."""
+    plt = pyplot()
+    reference = valcs_study.reference
+    result = results["lift_dist"]
+    stations = (result["lod/case"] == 0) & (result["lod/Wing"] == 1)
+
+    yloc_array = result["lod/S"][stations]
+    newcldist = (result["lod/Cl"][stations]*result["lod/Chord"][stations]
+                 / (result["lod_reference/Cref"][0]*result["polar/CL"][0]))
+
+    fig, ax1 = plt.subplots(1, sharex=True, dpi=DPI)
+    ax1.plot(yloc_array, newcldist, label="VSPAERO")
+    ax1.plot(reference["cldist"].x, reference["cldist"].y, linestyle="None",
+             color=PALETTE[1], marker=MARKERS[1], alpha=0.5,
+             label="Experimental")
+    ax1.set_xlim(left=0)
+    ax1.set_ylim(bottom=0)
+    ax1.set_xlabel("Normalized Span")
+    ax1.set_ylabel("Normalized Lift Coefficient")
+    ax1.legend()
+
+    return fig
+
+
+def report(valcs_study, casedir_dict):
+    """Return the mean error of the lift distribution."""
+    reference = valcs_study.reference
+    casedir = casedir_dict["lift_dist"]
+
+    lod_case = next(lod.iter_lod(
+        os.path.join(casedir, FNAME[:-5] + "_DegenGeom.lod")))
+    loaddist_array = lod.wing_stations(lod_case)
+
+    polar_dict = polar.read_polar(
+        os.path.join(casedir, FNAME[:-5] + "_DegenGeom.polar"))
+
+    cldist_vsp = loaddist_array[:, lod_case.columns["Cl"]]
+    yloc_array = loaddist_array[:, lod_case.columns["S"]]
+    chord_array = loaddist_array[:, lod_case.columns["Chord"]]
+    cref = lod_case.reference["Cref"]
+    CL = polar_dict["CL"][0]
+    newcldist = cldist_vsp*chord_array/(cref*CL)
+
+    # Error calculation
+    cLdist_error = metrics.mape(newcldist, reference["cldist"](yloc_array))
+    print(cLdist_error)
+
+    return {"cLdist_error": cLdist_error}
+
+
+# %% Study definition
+
+wing = study.Wing(
+    parms=(("Span", "XSec_1", midspan),
+           ("Root_Chord", "XSec_1", root_chord),
+           ("Tip_Chord", "XSec_1", tip_chord),
+           ("Sweep_Location", "XSec_1", sweep_loc),
+           ("Sweep", "XSec_1", sweep)),
+    xsec_shape="XS_SIX_SERIES",
+    xsec_parms=(("Series", "XSecCurve_0", series),
+                ("Series", "XSecCurve_1", series),
+                ("ThickChord", "XSecCurve_0", tc_rat),
+                ("ThickChord", "XSecCurve_1", tc_rat)))
+mesh = study.Mesh(chordwise_tess, spanwise_tess, root_clstr, tip_clstr,
+                  le_clstr, te_clstr)
+sweep_input = vspscript.SweepInput(FNAME, alpha_i, alpha_f, alpha_npts)
+
+STUDY = study.Study(
+    "valcs_4_lift_dist", STUDYDIR,
+    [study.Case("lift_dist", wing, sweep_input, mesh)],
+    reference={"cldist": catalog.get("valcs_4/cldist")},
+    report=report,
+    inputs=("data/cldist.dat",),
+    figures=(study.Figure(os.path.join(GRAPHICS_DIR, "lift_dist.pdf"),
+                          plot_lift_dist),))
+
+
+if __name__ == "__main__":
+    study.run_suite([STUDY])
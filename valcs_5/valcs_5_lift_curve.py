@@ -1,29 +1,18 @@
 """Run VSPAERO validation test 2."""
-import openvsp as vsp
 import os
-import subprocess
+import sys
 
 import numpy as np
-import matplotlib.pylab as plt
-import seaborn as sns
 
-from scipy import interpolate
-
-DPI = 300
-PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
-           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
-MARKERS = ["o", "^", "s", "P", "d"]
-GRAPHICS_DIR = "graphics"
-sns.set_theme(style="whitegrid", font="Times New Roman",
-              context="paper", palette=PALETTE)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import catalog, metrics, polar, study, vspscript
+from vspaero_tools.plotting import (DPI, GRAPHICS_DIR, MARKERS, PALETTE,
+                                    pyplot)
 
 # %% File system
 
-OUTPUTDIR = "output"
-VSPSCRIPT = "runVSPAEROSweep.vspscript"
+STUDYDIR = os.path.dirname(os.path.abspath(__file__))
 FNAME = "valcs_5.vsp3"
-FDIR = os.path.join(OUTPUTDIR, FNAME)
-VSPAERODIR = os.path.join(OUTPUTDIR, VSPSCRIPT)
 
 
 # %% User input
@@ -44,7 +33,7 @@ yloc_mgc = midspan/3 * (1 + 2*tap_rat)/(1 + tap_rat)
 xloc_mgc = root_chord/4
 zloc_mgc = 0.025
 
-xseccurve_type = vsp.XS_SIX_SERIES
+xseccurve_type = "XS_SIX_SERIES"
 tc_rat = 0.10
 series = 2
 cl_i = 0.2
@@ -68,225 +57,148 @@ mach = 0.17
 # Known results
 prcnt_error = 0.05
 
-xCL_wsh0 = [-2.960000000000001, -1.8400000000000056, -0.8800000000000026,
-            0.1599999999999966, 1.1999999999999957, 2.239999999999995,
-            3.4399999999999906, 4.47999999999999, 5.519999999999989,
-            6.63999999999999, 7.679999999999989, 8.639999999999986,
-            9.759999999999982, 10.879999999999981, 11.439999999999982,
-            11.999999999999982, 12.479999999999976, 12.95999999999998,
-            13.599999999999977, 13.999999999999975]
-yCL_wsh0 = [-0.14799999999999985, -0.05599999999999999, 0.03599999999999989,
-            0.12000000000000008, 0.21600000000000022, 0.31600000000000006,
-            0.39933331298828134, 0.4833333129882811, 0.5833333129882812,
-            0.6673333129882814, 0.7673333129882813, 0.8593333129882812,
-            0.9593333129882812, 1.031333312988281, 1.079333312988281,
-            1.119333312988281, 1.163333312988281, 1.203333312988281,
-            1.239333312988281, 1.0873333129882812]
-expCL_wsh0 = np.array([xCL_wsh0, yCL_wsh0]).T
-
-xCL_wsh2 = [-2.988142292490118, -1.9920948616600789, -0.9486166007905138,
-            0.23715415019762845, 1.233201581027668, 2.276679841897233,
-            3.4150197628458496, 4.411067193675889, 5.50197628458498,
-            6.4980237154150196, 6.545454545454545, 7.541501976284584,
-            8.632411067193676, 9.723320158102766, 10.861660079051383,
-            11.288537549407113, 12.42687747035573, 12.901185770750986,
-            13.42292490118577, 14.039525691699604, 14.466403162055334]
-yCL_wsh2 = [-0.174390243902439, -0.08414634146341464, 0.013414634146341461,
-            0.10365853658536583, 0.19878048780487803, 0.28414634146341466,
-            0.38170731707317074, 0.4670731707317073, 0.5658536585365854,
-            0.6487804878048781, 0.6707317073170732, 0.7463414634146341,
-            0.8439024390243902, 0.9317073170731708, 1.0219512195121951,
-            1.073170731707317, 1.1536585365853658, 1.1926829268292682,
-            1.226829268292683, 1.2317073170731707, 1.1317073170731706]
-expCL_wsh2 = np.array([xCL_wsh2, yCL_wsh2]).T
-
-expCL_array_list = [expCL_wsh0, expCL_wsh2]
-
-
-xCM_wsh0 = [-0.036000000000000004, -0.036000000000000004,
-            -0.037333333333333336, -0.037333333333333336, -0.03866666666666667,
-            -0.03866666666666667, -0.037333333333333336, -0.036000000000000004,
-            -0.036000000000000004, -0.03333333333333334, -0.036000000000000004,
-            -0.03333333333333334, -0.03466666666666667, -0.032, -0.032, -0.032,
-            -0.029333333333333336, -0.028000000000000004,
-            -0.029333333333333336, -0.029333333333333336,
-            -0.026666666666666672, -0.028000000000000004, -0.05066666666666667]
-yCM_wsh0 = [-0.14, -0.14, -0.04666666666666666, -0.04666666666666666,
-            0.04133333333333336, 0.04133333333333336, 0.12400000000000005,
-            0.22000000000000003, 0.316, 0.3960000000000001,
-            0.48133333333333345, 0.5840000000000001, 0.6693333333333333,
-            0.7733333333333334, 0.8533333333333335, 0.9466666666666668,
-            1.0266666666666668, 1.0693333333333335, 1.1093333333333335,
-            1.1493333333333335, 1.194666666666667, 1.2346666666666668,
-            1.0826666666666669]
-expCM_wsh0 = np.array([xCM_wsh0, yCM_wsh0]).T
-
-
-xCM_wsh2 = [-0.03684210526315789, -0.035526315789473684, -0.03684210526315789,
-            -0.03684210526315789, -0.03684210526315789, -0.03684210526315789,
-            -0.03684210526315789, -0.035526315789473684, -0.03684210526315789,
-            -0.031578947368421054, -0.03684210526315789, -0.035526315789473684,
-            -0.034210526315789476, -0.034210526315789476, -0.03289473684210526,
-            -0.035526315789473684, -0.03289473684210526, -0.030263157894736843,
-            -0.030263157894736843, -0.02763157894736842, -0.05526315789473684]
-yCM_wsh2 = [-0.17866666666666667, -0.08, 0.008000000000000007,
-            0.09866666666666668, 0.19200000000000006, 0.28,
-            0.37760001627604173, 0.4576000162760417, 0.5536000162760417,
-            0.6416000162760418, 0.6576000162760418, 0.7322666829427085,
-            0.8282666829427086, 0.9216000162760418, 1.0069333496093753,
-            1.0570666910807294, 1.0970666910807294, 1.1370666910807294,
-            1.1744000244140627, 1.2090666910807293, 1.115733357747396]
-expCM_wsh2 = np.array([xCM_wsh2, yCM_wsh2]).T
-
-expCM_array_list = [expCM_wsh0, expCM_wsh2]
-
-
-# %%Define funxtion to set analysis parameters
-
-def setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach=0.0, x_cg=0.0,
-                         y_cg=0.0, z_cg=0.0,
-                         chord_mgc=(root_chord+tip_chord)/2):
-    with open(VSPAERODIR) as file_object:
-        vspscriptlines = file_object.readlines()
-    vspscriptlines[10] = '	  string fname = "{0}";\n'.format(FNAME)
-    vspscriptlines[47] = "    double alpha_i = {0};\n".format(alpha_i)
-    vspscriptlines[52] = "    double alpha_f = {0};\n".format(alpha_f)
-    vspscriptlines[57] = "    double alpha_npts = {0};\n".format(alpha_npts)
-    vspscriptlines[62] = "    double mach_i = {0:.2f};\n".format(mach)
-
-    vspscriptlines[68] = "    double x_cg = {0:.3f};\n".format(x_cg)
-    vspscriptlines[73] = "    double y_cg = {0:.3f};\n".format(y_cg)
-    vspscriptlines[78] = "    double z_cg = {0:.3f};\n".format(z_cg)
-
-    vspscriptlines[84] = "    double chord_mgc = {0:.3f};\n".format(chord_mgc)
-
-    with open(VSPAERODIR, "w") as file_object:
-        file_object.writelines(vspscriptlines)
-
-
-# %% Create OpenVSP file
-
-fig1, ax1 = plt.subplots(1, sharey=True, dpi=DPI)
-fig2, ax2 = plt.subplots(1, sharex=True, dpi=DPI)
-for i, twist in enumerate(twist_array):
-    vsp.ClearVSPModel()
-
-    # Add wing
-    wing_id = vsp.AddGeom("WING")
-
-    # Modify wing
-    vsp.SetParmValUpdate(wing_id, "Span", "XSec_1", midspan)
-    vsp.SetParmValUpdate(wing_id, "Root_Chord", "XSec_1", root_chord)
-    vsp.SetParmValUpdate(wing_id, "Tip_Chord", "XSec_1", tip_chord)
-    vsp.SetParmValUpdate(wing_id, "Sweep_Location", "XSec_1", sweep_loc)
-    vsp.SetParmValUpdate(wing_id, "Sweep", "XSec_1", sweep)
-    vsp.SetParmValUpdate(wing_id, "Dihedral", "XSec_1", dihedral)
-    vsp.SetParmValUpdate(wing_id, "Twist", "XSec_1", twist)
-    vsp.SetParmValUpdate(wing_id, "RotateMatchDideralFlag",
-                         "XSec_1", tipmatchdhdrl_flag)
-
-    xsec_surf = vsp.GetXSecSurf(wing_id, 0)
-    vsp.ChangeXSecShape(xsec_surf, 0, xseccurve_type)
-    vsp.ChangeXSecShape(xsec_surf, 1, xseccurve_type)
-    vsp.Update()
-    vsp.SetParmValUpdate(wing_id, "Series", "XSecCurve_0", series)
-    vsp.SetParmValUpdate(wing_id, "Series", "XSecCurve_1", series)
-    vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_0", tc_rat)
-    vsp.SetParmValUpdate(wing_id, "ThickChord", "XSecCurve_1", tc_rat)
-    vsp.SetParmValUpdate(wing_id, "IdealCl", "XSecCurve_0", cl_i)
-    vsp.SetParmValUpdate(wing_id, "IdealCl", "XSecCurve_1", cl_i)
-
-    # Modifiy mesh
-    vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tess)
-    vsp.SetParmValUpdate(wing_id, "SectTess_U", "XSec_1", spanwise_tess)
-    vsp.SetParmValUpdate(wing_id, "InCluster", "XSec_1", root_clstr)
-    vsp.SetParmValUpdate(wing_id, "OutCluster", "XSec_1", tip_clstr)
-    vsp.SetParmValUpdate(wing_id, "LECluster", "WingGeom", le_clstr)
-    vsp.SetParmValUpdate(wing_id, "TECluster", "WingGeom", te_clstr)
-    vsp.Update()
-
-    vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-    vsp.Update()
-
-    setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts,
-                         mach=mach, x_cg=xloc_mgc, z_cg=zloc_mgc,
-                         chord_mgc=chord_mgc)
-
-    vsp.ClearVSPModel()
-    vsp.ReadVSPFile(FDIR)
-    vsp.Update()
-
-    subprocess.run(["vsp", "-script", VSPSCRIPT], shell=True, cwd=OUTPUTDIR)
-
-    polar_array = np.loadtxt(
-        os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.polar"), skiprows=1)
-
-    CL_array = polar_array[:, 4]
-    CM_array = polar_array[:, 18]
-
-# Plot results
-
-    ax1.plot(alpha_array, CL_array,
-             label="VSPAERO, " + r"$\mathdefault{\phi_{G}}=$" +
-             "{0}°".format(int(twist)))
-    ax1.plot(expCL_array_list[i][:, 0], expCL_array_list[i][:, 1],
-             linestyle="None", color=PALETTE[i], marker=MARKERS[1], alpha=0.5,
-             label="Experimental, " +
-             r"$\mathdefault{\phi_{G}}=$" + "{0}°".format(int(twist)))
-    # ax1.fill_between(expCL_array_list[i][:, 0],
-    # expCL_array_list[i][:, 1]*(1 + prcnt_error),
-    # expCL_array_list[i][:, 1]*(1 - prcnt_error), alpha=0.25,
-    # color=PALETTE[i])
+
+# %% Report
+
+def twist_name(twist):
+    """Return the case name of a geometric twist."""
+    return "twist{0:g}".format(twist)
+
+
+def twist_label(twist):
+    """Return the legend label of a geometric twist."""
+    return r"$\mathdefault{\phi_{G}}=$" + "{0}°".format(int(twist))
+
+
+def plot_lift_curves(valcs_study, results):
+    """Plot the lift curve of every twist against the experiment."""
+    plt = pyplot()
+    reference = valcs_study.reference
+
+    fig, ax1 = plt.subplots(1, sharey=True, dpi=DPI)
+    for i, twist in enumerate(twist_array):
+        CL_array = results[twist_name(twist)]["polar/CL"]
+        expCL = reference["CL"][i]
+
+        ax1.plot(alpha_array, CL_array,
+                 label="VSPAERO, " + twist_label(twist))
+        ax1.plot(expCL.x, expCL.y,
+                 linestyle="None", color=PALETTE[i], marker=MARKERS[1],
+                 alpha=0.5, label="Experimental, " + twist_label(twist))
+
     ax1.set_xlabel("Angle of Attack, °")
     ax1.set_ylabel("Lift Coefficient")
     ax1.legend()
 
-    fig1.savefig(os.path.join(GRAPHICS_DIR, "lift_curves.pdf"), format="pdf",
-                 bbox_inches="tight")
-
-    ax2.plot(CL_array, CM_array, label="VSPAERO, " + r"$\mathdefault{\phi_{G}}=$" +
-             "{0}°".format(int(twist)))
-    ax2.plot(expCM_array_list[i][:, 1], expCM_array_list[i][:, 0],
-             linestyle="None", color=PALETTE[i], marker=MARKERS[1], alpha=0.5,
-             label="Experimental, " +
-             r"$\mathdefault{\phi_{G}}=$" + "{0}°".format(int(twist)))
-    # ax2.fill_between(expCM_array_list[i][:, 1],
-    #                   expCM_array_list[i][:, 0]*(1 + prcnt_error),
-    #                   expCM_array_list[i][:, 0]*(1 - prcnt_error), alpha=0.25,
-    #                   color=PALETTE[i])
+    return fig
+
+
+def plot_moment_curves(valcs_study, results):
+    """Plot the moment curve of every twist against the experiment."""
+    plt = pyplot()
+    reference = valcs_study.reference
+
+    fig, ax2 = plt.subplots(1, sharex=True, dpi=DPI)
+    for i, twist in enumerate(twist_array):
+        CL_array = results[twist_name(twist)]["polar/CL"]
+        CM_array = results[twist_name(twist)]["polar/CMy"]
+        expCM = reference["CM"][i]
+
+        ax2.plot(CL_array, CM_array, label="VSPAERO, " + twist_label(twist))
+        ax2.plot(expCM.x, expCM.y,
+                 linestyle="None", color=PALETTE[i], marker=MARKERS[1],
+                 alpha=0.5, label="Experimental, " + twist_label(twist))
+
     ax2.set_ylim(top=0, bottom=-0.10)
 
     ax2.set_xlabel("Lift Coefficient")
     ax2.set_ylabel("Pitching Moment Coefficient")
-    #ax2.legend()
-    fig2.savefig(os.path.join(GRAPHICS_DIR, "moment_curves.pdf"), format="pdf",
-                 bbox_inches="tight")
-
-# %%
-
-    expCLfromalpha = interpolate.interp1d(expCL_array_list[i][:, 0], expCL_array_list[i][:, 1], fill_value="extrapolate")
-    expCL4error = expCLfromalpha(alpha_array)
-
-    expdCLdalpha = np.mean(expCL4error[1:] - expCL4error[:-1]) * 180/np.pi
-    dCLdalpha = np.mean(CL_array[1:] - CL_array[:-1]) * 180/np.pi
-    dCLdalpha_error = np.abs((dCLdalpha - expdCLdalpha)/expdCLdalpha) * 100
-    # print(round(expdCLdalpha, 4))
-    # print(round(dCLdalpha, 4))
-    # print(round(dCLdalpha_error, 2))
-    # print("------------------------------------")
-
-    CL4error_array = np.linspace(-0.125, 1.2, 10)
-    expCMfromCL = interpolate.interp1d(expCM_array_list[i][:, 1], expCM_array_list[i][:, 0], fill_value="extrapolate")
-    expCM4error = expCMfromCL(CL4error_array)
-    expdCMdCL = np.mean((expCM4error[1:] - expCM4error[:-1])/(CL4error_array[1:] - CL4error_array[:-1]))
-
-
-    CMfromCL = interpolate.interp1d(CL_array, CM_array, fill_value="extrapolate")
-    CM4error = CMfromCL(CL4error_array)
-    dCMdCL = np.mean((CM4error[1:] - CM4error[:-1])/(CL4error_array[1:] - CL4error_array[:-1]))
-
-    dCMdCL_error = np.abs((dCMdCL - expdCMdCL)/expdCMdCL) * 100
-    print(round(expdCMdCL, 4))
-    print(round(dCMdCL, 4))
-    print(round(dCMdCL_error, 2))
-    print("__________________________")
+
+    return fig
+
+
+def report(valcs_study, casedir_dict):
+    """Return the lift and moment slope errors of every twist."""
+    reference = valcs_study.reference
+    metric_dict = {}
+
+    for i, twist in enumerate(twist_array):
+        polar_dict = polar.read_polar(os.path.join(
+            casedir_dict[twist_name(twist)], FNAME[:-5] + "_DegenGeom.polar"))
+
+        CL_array = polar_dict["CL"]
+        CM_array = polar_dict["CMy"]
+        expCL = reference["CL"][i]
+        expCM = reference["CM"][i]
+
+        # Error calculation
+        expCL4error = expCL(alpha_array)
+        dCLdalpha_error = metrics.percent_error(
+            metrics.lift_slope(alpha_array, CL_array),
+            metrics.lift_slope(alpha_array, expCL4error))
+
+        CL4error_array = np.linspace(-0.125, 1.2, 10)
+        expCM4error = expCM(CL4error_array)
+        expdCMdCL = metrics.moment_slope(CL4error_array, expCM4error)
+
+        CM4error = metrics.interp(CL4error_array, CL_array, CM_array)
+        dCMdCL = metrics.moment_slope(CL4error_array, CM4error)
+
+        dCMdCL_error = metrics.percent_error(dCMdCL, expdCMdCL)
+        print(round(expdCMdCL, 4))
+        print(round(dCMdCL, 4))
+        print(round(dCMdCL_error, 2))
+        print("__________________________")
+
+        metric_dict[twist_name(twist)] = {"dCLdalpha_error": dCLdalpha_error,
+                                          "dCMdCL_error": dCMdCL_error}
+
+    return metric_dict
+
+
+# %% Study definition
+
+mesh = study.Mesh(chordwise_tess, spanwise_tess, root_clstr, tip_clstr,
+                  le_clstr, te_clstr)
+sweep_input = vspscript.SweepInput(FNAME, alpha_i, alpha_f, alpha_npts,
+                                   mach=mach, x_cg=xloc_mgc, z_cg=zloc_mgc,
+                                   cref=chord_mgc)
+
+case_list = []
+for twist in twist_array:
+    wing = study.Wing(
+        parms=(("Span", "XSec_1", midspan),
+               ("Root_Chord", "XSec_1", root_chord),
+               ("Tip_Chord", "XSec_1", tip_chord),
+               ("Sweep_Location", "XSec_1", sweep_loc),
+               ("Sweep", "XSec_1", sweep),
+               ("Dihedral", "XSec_1", dihedral),
+               ("Twist", "XSec_1", twist),
+               ("RotateMatchDideralFlag", "XSec_1", tipmatchdhdrl_flag)),
+        xsec_shape=xseccurve_type,
+        xsec_parms=(("Series", "XSecCurve_0", series),
+                    ("Series", "XSecCurve_1", series),
+                    ("ThickChord", "XSecCurve_0", tc_rat),
+                    ("ThickChord", "XSecCurve_1", tc_rat),
+                    ("IdealCl", "XSecCurve_0", cl_i),
+                    ("IdealCl", "XSecCurve_1", cl_i)))
+    case_list.append(
+        study.Case(twist_name(twist), wing, sweep_input, mesh))
+
+STUDY = study.Study(
+    "valcs_5_lift_curve", STUDYDIR, case_list,
+    reference={"CL": [catalog.get("valcs_5/CL_wsh0"),
+                      catalog.get("valcs_5/CL_wsh2")],
+               "CM": [catalog.get("valcs_5/CM_wsh0"),
+                      catalog.get("valcs_5/CM_wsh2")]},
+    report=report,
+    inputs=("data/CL_wsh0.dat", "data/CL_wsh2.dat", "data/CM_wsh0.dat",
+            "data/CM_wsh2.dat"),
+    figures=(study.Figure(os.path.join(GRAPHICS_DIR, "lift_curves.pdf"),
+                          plot_lift_curves),
+             study.Figure(os.path.join(GRAPHICS_DIR, "moment_curves.pdf"),
+                          plot_moment_curves)))
+
+
+if __name__ == "__main__":
+    study.run_suite([STUDY])
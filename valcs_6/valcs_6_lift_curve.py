@@ -1,30 +1,19 @@
 """Run VSPAERO validation test A."""
-import openvsp as vsp
 import os
-import subprocess
+import sys
 
 import numpy as np
-import matplotlib.pylab as plt
-import seaborn as sns
 
-from scipy import interpolate
-
-DPI = 300
-PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
-           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
-MARKERS = ["o", "^", "s", "P", "d"]
-GRAPHICS_DIR = "graphics"
-sns.set_theme(style="whitegrid", font="Times New Roman",
-              context="paper", palette=PALETTE)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vspaero_tools import catalog, metrics, polar, study, vspscript
+from vspaero_tools.plotting import (DPI, GRAPHICS_DIR, MARKERS, PALETTE,
+                                    pyplot)
 
 # %% File system
 
-OUTPUTDIR = "output"
+STUDYDIR = os.path.dirname(os.path.abspath(__file__))
 DATADIR = "data"
-VSPSCRIPT = "runVSPAEROSweep.vspscript"
 FNAME = "valcs_6.vsp3"
-FDIR = os.path.join(OUTPUTDIR, FNAME)
-VSPAERODIR = os.path.join(OUTPUTDIR, VSPSCRIPT)
 
 
 # %% User input
@@ -59,107 +48,95 @@ alpha_array = np.linspace(alpha_i, alpha_f, alpha_npts)
 prcnt_error = 0.05
 
 
-# %%Define funxtion to set analysis parameters
-
-def setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, mach=0.0, x_cg=0.0,
-                         y_cg=0.0, z_cg=0.0,
-                         chord_mgc=chord_mgc):
-    with open(VSPAERODIR) as file_object:
-        vspscriptlines = file_object.readlines()
-    vspscriptlines[10] = '	  string fname = "{0}";\n'.format(FNAME)
-    vspscriptlines[47] = "    double alpha_i = {0};\n".format(alpha_i)
-    vspscriptlines[52] = "    double alpha_f = {0};\n".format(alpha_f)
-    vspscriptlines[57] = "    double alpha_npts = {0};\n".format(alpha_npts)
-    vspscriptlines[62] = "    double mach_i = {0:.2f};\n".format(mach)
-
-    vspscriptlines[68] = "    double x_cg = {0:.3f};\n".format(x_cg)
-    vspscriptlines[73] = "    double y_cg = {0:.3f};\n".format(y_cg)
-    vspscriptlines[78] = "    double z_cg = {0:.3f};\n".format(z_cg)
-
-    vspscriptlines[84] = "    double chord_mgc = {0:.3f};\n".format(chord_mgc)
-
-    with open(VSPAERODIR, "w") as file_object:
-        file_object.writelines(vspscriptlines)
-
-
-# %% Create OpenVSP file
-
-# fig1, ax1 = plt.subplots(1, sharex=True, dpi=DPI)
-# ax1 = ax1
-
-#fig2, ax2 = plt.subplots(1, sharex=True, dpi=DPI)
-for i, wing in enumerate(wing_list):
-    vsp.ClearVSPModel()
-
-    # Add wing
-    wing_id = vsp.AddGeom("WING")
+# %% Report
 
-    # Modify wing
-    vsp.SetDriverGroup(wing_id, 1, vsp.AR_WSECT_DRIVER,
-                       vsp.TAPER_WSECT_DRIVER, vsp.SPAN_WSECT_DRIVER)
-    vsp.SetParmValUpdate(wing_id, "Aspect", "XSec_1", wing[1]/2)
-    vsp.SetParmValUpdate(wing_id, "Span", "XSec_1", wing[0]/2)
-    vsp.SetParmValUpdate(wing_id, "Taper", "XSec_1", TR)
-    vsp.SetParmValUpdate(wing_id, "Sweep_Location", "XSec_1", sweep_loc)
-    vsp.SetParmValUpdate(wing_id, "Sweep", "XSec_1", sweep)
+def wing_name(wing):
+    """Return the case name of a wing."""
+    return "AR{0}".format(int(wing[1]))
 
-    # Modifiy mesh
-    vsp.SetParmValUpdate(wing_id, "Tess_W", "Shape", chordwise_tess)
-    vsp.SetParmValUpdate(wing_id, "SectTess_U", "XSec_1", spanwise_tess)
-    vsp.SetParmValUpdate(wing_id, "InCluster", "XSec_1", root_clstr)
-    vsp.SetParmValUpdate(wing_id, "OutCluster", "XSec_1", tip_clstr)
-    vsp.SetParmValUpdate(wing_id, "LECluster", "WingGeom", le_clstr)
-    vsp.SetParmValUpdate(wing_id, "TECluster", "WingGeom", te_clstr)
-    vsp.Update()
 
-    vsp.WriteVSPFile(FDIR, vsp.SET_ALL)
-    vsp.Update()
-
-    setVSPAEROsweepinput(alpha_i, alpha_f, alpha_npts, chord_mgc=chord_mgc)
-
-    vsp.ClearVSPModel()
-    vsp.ReadVSPFile(FDIR)
-    vsp.Update()
-
-    subprocess.run(["vsp", "-script", VSPSCRIPT], shell=True, cwd=OUTPUTDIR)
-
-    polar_array = np.loadtxt(
-        os.path.join(OUTPUTDIR, FNAME[:-5] + "_DegenGeom.polar"), skiprows=1)
-
-    CL_array = polar_array[:, 4]
-    CM_array = polar_array[:, 18]
-
-
-# %%
+def plot_lift_curve(valcs_study, results, i):
+    """Plot the lift curve of the `i`-th wing against the experiment."""
+    plt = pyplot()
+    wing = wing_list[i]
+    CL_array = results[wing_name(wing)]["polar/CL"]
 
     # Known results
-    datafile = os.path.join(DATADIR, "AR{0}.dat".format(int(wing[1])))
-    exppolar_array = np.loadtxt(datafile, skiprows=1)
-    exppolar_array = exppolar_array[np.lexsort(
-        (exppolar_array[:, 1], exppolar_array[:, 0]))][::2, :]
-    expCL_array = exppolar_array[:, 1]
-    expalpha_array = exppolar_array[:, 0]
+    exppolar = valcs_study.reference[wing_name(wing)]
+    expCL_array = exppolar.y
+    expalpha_array = exppolar.x
 
-
-# %% Plot results
     fig, ax = plt.subplots(1, sharex=True, dpi=DPI)
     ax.plot(alpha_array, CL_array, label="VSPAERO", color=PALETTE[i])
-    ax.plot(expalpha_array, expCL_array, linestyle="None", label="Experimental", color=PALETTE[i], marker=MARKERS[1], alpha=0.5)
+    ax.plot(expalpha_array, expCL_array, linestyle="None",
+            label="Experimental", color=PALETTE[i], marker=MARKERS[1],
+            alpha=0.5)
     ax.set_xlabel("Angle of Attack, °")
     ax.set_ylabel("Lift Coefficient")
     ax.legend(title="AR = {0}".format(wing[1]))
-    fig.savefig(os.path.join(GRAPHICS_DIR, "lift_curves_AR{0}.pdf".format(int(wing[1]))), format="pdf",
-                  bbox_inches="tight")
-#%% Calculate the percent error
-
-    expCLfromalpha = interpolate.interp1d(
-        expalpha_array, expCL_array, fill_value="extrapolate")
-    expCL4error = expCLfromalpha(alpha_array)
-
-    expdCLdalpha = np.mean((expCL4error[1:] - expCL4error[:-1])/(alpha_array[1] - alpha_array[0])) * 180/np.pi
-    dCLdalpha = np.mean((CL_array[1:] - CL_array[:-1])/(alpha_array[1] - alpha_array[0])) * 180/np.pi
-    dCLdalpha_error = np.abs((dCLdalpha - expdCLdalpha)/expdCLdalpha) * 100
-    print("Experimental dCL/dalpha = {0}".format(round(expdCLdalpha, 4)))
-    print("VSPAERO dCL/dalpha = {0}".format(round(dCLdalpha, 4)))
-    print("% Error = {0}".format(round(dCLdalpha_error, 2)))
-    print("-----------------------------------------\n")
+
+    return fig
+
+
+def report(valcs_study, casedir_dict):
+    """Return the lift slope error of every wing."""
+    metric_dict = {}
+    for i, wing in enumerate(wing_list):
+        polar_dict = polar.read_polar(os.path.join(
+            casedir_dict[wing_name(wing)], FNAME[:-5] + "_DegenGeom.polar"))
+
+        CL_array = polar_dict["CL"]
+
+        # Known results
+        exppolar = valcs_study.reference[wing_name(wing)]
+
+        # Calculate the percent error
+        expCL4error = exppolar(alpha_array)
+        expdCLdalpha = metrics.lift_slope(alpha_array, expCL4error)
+        dCLdalpha = metrics.lift_slope(alpha_array, CL_array)
+        dCLdalpha_error = metrics.percent_error(dCLdalpha, expdCLdalpha)
+        print("Experimental dCL/dalpha = {0}".format(round(expdCLdalpha, 4)))
+        print("VSPAERO dCL/dalpha = {0}".format(round(dCLdalpha, 4)))
+        print("% Error = {0}".format(round(dCLdalpha_error, 2)))
+        print("-----------------------------------------\n")
+
+        metric_dict[wing_name(wing)] = {"dCLdalpha_error": dCLdalpha_error}
+
+    return metric_dict
+
+
+# %% Study definition
+
+mesh = study.Mesh(chordwise_tess, spanwise_tess, root_clstr, tip_clstr,
+                  le_clstr, te_clstr)
+sweep_input = vspscript.SweepInput(FNAME, alpha_i, alpha_f, alpha_npts,
+                                   cref=chord_mgc)
+
+case_list = []
+for wing in wing_list:
+    wing_geom = study.Wing(
+        parms=(("Aspect", "XSec_1", wing[1]/2),
+               ("Span", "XSec_1", wing[0]/2),
+               ("Taper", "XSec_1", TR),
+               ("Sweep_Location", "XSec_1", sweep_loc),
+               ("Sweep", "XSec_1", sweep)),
+        driver_group=("AR_WSECT_DRIVER", "TAPER_WSECT_DRIVER",
+                      "SPAN_WSECT_DRIVER"))
+    case_list.append(
+        study.Case(wing_name(wing), wing_geom, sweep_input, mesh))
+
+STUDY = study.Study(
+    "valcs_6_lift_curve", STUDYDIR, case_list,
+    reference={wing_name(wing): catalog.get(
+        "valcs_6/" + wing_name(wing)) for wing in wing_list},
+    report=report,
+    inputs=tuple(os.path.join(DATADIR, wing_name(wing) + ".dat")
+                 for wing in wing_list),
+    figures=tuple(study.Figure(
+        os.path.join(GRAPHICS_DIR,
+                     "lift_curves_{0}.pdf".format(wing_name(wing))),
+        plot_lift_curve, (i,)) for i, wing in enumerate(wing_list)))
+
+
+if __name__ == "__main__":
+    study.run_suite([STUDY])
@@ -0,0 +1 @@
+"""Shared tooling for the VSPAERO validation case studies."""
@@ -0,0 +1,201 @@
+"""Memory-map VSPAERO .adb solution databases without copying them."""
+import numpy as np
+
+ADB_MAGIC = (-123789453, -123789456)
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "<i4"), ("model_type", "<i4"), ("symmetry", "<i4"),
+    ("unsteady", "<i4"), ("nloops", "<i4"), ("nnodes", "<i4"),
+    ("ntris", "<i4"), ("nedges", "<i4"), ("sref", "<f4"), ("cref", "<f4"),
+    ("bref", "<f4"), ("xcg", "<f4"), ("ycg", "<f4"), ("zcg", "<f4"),
+    ("nsurfaces", "<i4")])
+SURFACE_DTYPE = np.dtype([("id", "<i4"), ("name", "S100"), ("flag", "<i4")])
+TRI_DTYPE = np.dtype([
+    ("nodes", "<i4", (3,)), ("surface_type", "<i4"), ("surface_id", "<i4"),
+    ("area", "<f4")])
+CASE_DTYPE = np.dtype([
+    ("mach", "<f4"), ("alpha", "<f4"), ("beta", "<f4"), ("cp_min", "<f4"),
+    ("cp_max", "<f4")])
+# The two trailing floats of every loop are zero in steady runs
+LOOP_DTYPE = np.dtype([("circulation", "<f8"), ("reserved", "<f4", (2,))])
+SEARCH_CHUNK = 1 << 14
+# Free-stream speed of the solution, the VSPAERO default the sweeps keep
+VINF = 100.0
+LIFT_RTOL = 0.01
+
+
+def read_header(path):
+    """Return the fixed-size header of a .adb file as a NumPy record."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)[0]
+    if int(header["magic"]) not in ADB_MAGIC:
+        raise ValueError("{0} is not a VSPAERO .adb file".format(path))
+
+    return header
+
+
+def read_cases(path):
+    """Return the Mach, alpha and beta (deg) of every case of .adb.cases."""
+    return np.loadtxt(path, usecols=(0, 1, 2), ndmin=2)
+
+
+class Adb:
+    """Read-only, memory-mapped view of a .adb file.
+
+    `nodes`, `tris`, `case_header` and `loops` are NumPy views into the
+    mapping, so only the pages actually indexed are read from disk. The
+    cases listed in the `.adb.cases` file next to `path` locate the solution
+    records: the first record is found by its Mach, alpha and beta, and the
+    following ones lie at a fixed stride after it.
+
+    `case_header` holds the Mach number, alpha and beta (rad) and the Cp
+    range of every case; `circulation` is the (case, vortex loop) ring
+    circulation that opens each solution record. It is dimensional, scaled
+    by the free-stream speed, and positive for negative lift; the records
+    of steady runs hold no loop Cp, which delta_cp derives from it.
+    """
+
+    def __init__(self, path, cases_path=None):
+        self.path = path
+        self.buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self.header = self._view(HEADER_DTYPE, 0)
+        if int(self.header["magic"]) not in ADB_MAGIC:
+            raise ValueError("{0} is not a VSPAERO .adb file".format(path))
+
+        offset = HEADER_DTYPE.itemsize
+        self.surfaces = self._view(
+            SURFACE_DTYPE, offset, (int(self.header["nsurfaces"]),))
+
+        # Two reserved ints separate the surface table from the mesh
+        offset += self.surfaces.nbytes + 8
+        self.tris = self._view(TRI_DTYPE, offset, (int(self.header["ntris"]),))
+
+        offset += self.tris.nbytes
+        self.nodes = self._view(
+            np.dtype("<f4"), offset, (int(self.header["nnodes"]), 3))
+
+        self.cases = read_cases(cases_path or path + ".cases")
+        first = self._find_case(offset + self.nodes.nbytes, self.cases[0])
+        stride, remainder = divmod(self.buffer.size - first, len(self.cases))
+        if remainder:
+            raise ValueError("{0} does not hold {1} solution records".format(
+                path, len(self.cases)))
+
+        self.case_header = self._view(
+            CASE_DTYPE, first, (len(self.cases),), (stride,))
+        self.loops = self._view(
+            LOOP_DTYPE, first + CASE_DTYPE.itemsize,
+            (len(self.cases), int(self.header["nloops"])),
+            (stride, LOOP_DTYPE.itemsize))
+        self.circulation = self.loops["circulation"]
+
+    def _view(self, dtype, offset, shape=(), strides=None):
+        return np.ndarray(shape, dtype=dtype, buffer=self.buffer,
+                          offset=offset, strides=strides)
+
+    def _find_case(self, start, case):
+        # Scan in chunks so that only the geometry tail is paged in
+        size = (self.buffer.size - start)//4
+        words = self._view(np.dtype("<f4"), start, (size,))
+        mach, alpha, beta = np.float32(case[0]), *np.radians(case[1:])
+        for i in range(0, size - 2, SEARCH_CHUNK):
+            chunk = words[i:i + SEARCH_CHUNK + 2]
+            match = ((chunk[:-2] == mach)
+                     & np.isclose(chunk[1:-1], alpha, rtol=0.0, atol=1e-6)
+                     & np.isclose(chunk[2:], beta, rtol=0.0, atol=1e-6))
+            index = np.flatnonzero(match)
+            if index.size:
+                return start + 4*(i + int(index[0]))
+
+        raise ValueError("case {0} not found in {1}".format(case, self.path))
+
+    @property
+    def surface_names(self):
+        """Names of the surfaces, stripped of their C string padding."""
+        return [name.split(b"\0")[0].decode()
+                for name in self.surfaces["name"]]
+
+    @property
+    def connectivity(self):
+        """Node numbers (one-based, as written by VSPAERO) of each tri."""
+        return self.tris["nodes"]
+
+    def loop_edges(self):
+        """Return the leading and trailing edge nodes of every vortex loop.
+
+        Every loop is the quad of two consecutive tris; each of its edges
+        is a pair of zero-based node indices. Raise ValueError when the
+        loops do not pair up with the tris this way, as for meshes with
+        more loops than quads.
+        """
+        tri_pairs = (np.asarray(self.connectivity) - 1).reshape(-1, 2, 3)
+        shared = (tri_pairs[:, 0, :, None]
+                  == tri_pairs[:, 1, None, :]).sum(axis=(1, 2))
+        if (len(tri_pairs) != int(self.header["nloops"])
+                or np.any(shared != 2)):
+            raise ValueError("the loops of {0} are not quads of its "
+                             "tris".format(self.path))
+
+        node_pairs = np.sort(tri_pairs.reshape(-1, 6), axis=1)
+        first = np.ones(node_pairs.shape, dtype=bool)
+        first[:, 1:] = node_pairs[:, 1:] != node_pairs[:, :-1]
+        quads = node_pairs[first].reshape(-1, 4)
+
+        # The two nodes of lowest y bound one side of the loop, the other
+        # two the opposite side; the foremost node of a side is on the
+        # leading edge
+        nodes = np.asarray(self.nodes)
+        sides = np.take_along_axis(
+            quads, np.argsort(nodes[quads, 1], axis=1, kind="stable"),
+            axis=1).reshape(-1, 2, 2)
+        sides = np.take_along_axis(
+            sides, np.argsort(nodes[sides, 0], axis=2, kind="stable"),
+            axis=2)
+
+        return np.sort(sides[:, :, 0], axis=1), np.sort(sides[:, :, 1], axis=1)
+
+    def delta_cp(self, vinf=VINF):
+        """Return the (case, vortex loop) Cp jump across the surface.
+
+        A ring carries the circulation of the loops ahead of it, so the
+        jump of a loop follows from its circulation less that of the loop
+        whose trailing edge is its leading edge, over its chord. It has the
+        sign of the dCp of .slc cuts.
+        """
+        le, te = self.loop_edges()
+        index_dict = {tuple(edge): i for i, edge in enumerate(te)}
+        upstream = np.array([index_dict.get(tuple(edge), -1) for edge in le])
+
+        circulation = np.asarray(self.circulation)
+        jump = circulation - np.where(upstream >= 0,
+                                      circulation[:, upstream], 0.0)
+        x = np.asarray(self.nodes)[:, 0]
+        chord = x[te].mean(axis=1) - x[le].mean(axis=1)
+
+        return 2*jump/(vinf*chord)
+
+    def lift_coefficient(self, vinf=VINF):
+        """Return the CL of every case, integrated from delta_cp."""
+        le, te = self.loop_edges()
+        nodes = np.asarray(self.nodes)
+        chord = nodes[te, 0].mean(axis=1) - nodes[le, 0].mean(axis=1)
+        span = np.abs(nodes[le[:, 1], 1] - nodes[le[:, 0], 1])
+
+        return -(self.delta_cp(vinf)*chord*span).sum(axis=1)/float(
+            self.header["sref"])
+
+    def __len__(self):
+        return len(self.cases)
+
+
+def check_lift(adb_file, cl, vinf=VINF, rtol=LIFT_RTOL):
+    """Check the loop solution of `adb_file` against the CL of its cases.
+
+    `cl` holds the CL of every case, e.g. from the .polar file. Raise
+    ValueError when the lift_coefficient of a case differs by more than
+    `rtol` of the largest |CL|, as when the record layout is misread.
+    """
+    cl = np.asarray(cl, dtype=float)
+    loop_cl = adb_file.lift_coefficient(vinf)
+    if np.any(np.abs(loop_cl - cl) > rtol*np.abs(cl).max() + 1e-6):
+        raise ValueError("the loops of {0} give CL {1}, not {2}".format(
+            adb_file.path, loop_cl, cl))
@@ -0,0 +1,179 @@
+"""Run VSPAERO sweeps in-process through the OpenVSP Python API."""
+import os
+import time
+
+import numpy as np
+
+from . import runlog, runner
+
+API_SCRIPT = "api"
+COMPGEOM_ANALYSIS = "VSPAEROComputeGeometry"
+SWEEP_ANALYSIS = "VSPAEROSweep"
+POLAR_RESULTS = "VSPAERO_Polar"
+
+
+def _openvsp():
+    # Imported here so that the subprocess fallback works without it
+    try:
+        import openvsp
+    except ImportError:
+        return None
+    return openvsp
+
+
+def api_errors(vsp):
+    """Return the exception types a failed API call raises.
+
+    OpenVSP 3.33 and later raise VSPException for the errors the API
+    reports; the wrapped C++ raises RuntimeError.
+    """
+    return (RuntimeError, getattr(vsp, "VSPException", RuntimeError))
+
+
+def available():
+    """Return True when the openvsp Python module can be imported."""
+    return _openvsp() is not None
+
+
+def set_inputs(sweep_input, ncpu=None):
+    """Set the VSPAEROSweep inputs of `sweep_input` on the live model.
+
+    These are the inputs the AngelScript rendered by vspscript.render sets,
+    plus the number of solver threads when `ncpu` is given.
+    """
+    vsp = _openvsp()
+    vsp.SetAnalysisInputDefaults(SWEEP_ANALYSIS)
+
+    vsp.SetIntAnalysisInput(SWEEP_ANALYSIS, "GeomSet", [0], 0)
+    vsp.SetIntAnalysisInput(SWEEP_ANALYSIS, "RefFlag", [1], 0)
+    vsp.SetStringAnalysisInput(SWEEP_ANALYSIS, "WingID",
+                               vsp.FindGeomsWithName("WingGeom"), 0)
+
+    double_list = [("AlphaStart", sweep_input.alpha_i),
+                   ("AlphaEnd", sweep_input.alpha_f),
+                   ("MachStart", sweep_input.mach),
+                   ("Xcg", sweep_input.x_cg),
+                   ("Ycg", sweep_input.y_cg),
+                   ("Zcg", sweep_input.z_cg)]
+    int_list = [("AlphaNpts", sweep_input.alpha_npts)]
+    if sweep_input.mach_npts > 1:
+        double_list.append(("MachEnd", sweep_input.mach_f))
+        int_list.append(("MachNpts", sweep_input.mach_npts))
+    if sweep_input.cref is not None:
+        double_list.append(("cref", sweep_input.cref))
+    if sweep_input.wake_iters is not None:
+        int_list.append(("WakeNumIter", sweep_input.wake_iters))
+    if sweep_input.wake_nodes is not None:
+        int_list.append(("NumWakeNodes", sweep_input.wake_nodes))
+    if ncpu is not None:
+        int_list.append(("NCPU", ncpu))
+
+    for name, value in double_list:
+        vsp.SetDoubleAnalysisInput(SWEEP_ANALYSIS, name, [float(value)], 0)
+    for name, value in int_list:
+        vsp.SetIntAnalysisInput(SWEEP_ANALYSIS, name, [int(value)], 0)
+    vsp.Update()
+
+
+def run_model(casedir, sweep_input, ncpu=None):
+    """Solve the live model with its outputs in `casedir`.
+
+    The model is not re-read: its .vsp3 file name is only pointed at
+    `casedir` so that VSPAERO writes its result files there. Return the
+    results ID of the sweep.
+    """
+    vsp = _openvsp()
+    vsp.SetVSP3FileName(os.path.abspath(
+        os.path.join(casedir, sweep_input.fname)))
+    vsp.Update()
+
+    vsp.SetAnalysisInputDefaults(COMPGEOM_ANALYSIS)
+    vsp.ExecAnalysis(COMPGEOM_ANALYSIS)
+
+    set_inputs(sweep_input, ncpu)
+
+    return vsp.ExecAnalysis(SWEEP_ANALYSIS)
+
+
+def read_results(results_id):
+    """Return the double data of a results ID as a dict of arrays."""
+    vsp = _openvsp()
+    result_dict = {}
+    for name in vsp.GetAllDataNames(results_id):
+        if vsp.GetResultsType(results_id, name) == vsp.DOUBLE_DATA:
+            result_dict[name] = np.array(
+                vsp.GetDoubleResults(results_id, name))
+
+    return result_dict
+
+
+def polar_results():
+    """Return the polar of the latest sweep from the results manager."""
+    return read_results(_openvsp().FindLatestResultsID(POLAR_RESULTS))
+
+
+def _fallback(casedir, log_path, tags, reason):
+    # The runlog entry of the fallback run says why the API run was dropped
+    fallback_tags = dict(tags or {}, api_fallback=True, api_error=reason)
+    return runner.run_case(casedir, log_path=log_path, tags=fallback_tags)
+
+
+def run_case(casedir, sweep_input, log_path=runlog.RUN_LOG, tags=None,
+             ncpu=None, reread=True):
+    """Solve the .vsp3 file of `casedir` in-process; return the wall time.
+
+    With `reread` False the live model is solved as it is, e.g. the one
+    held by a geometry.Session, and must match the file. The sweep is
+    checked through its polar in the results manager. When an API call
+    raises one of api_errors or the sweep leaves no polar, the case falls
+    back to runner.run_case, i.e. ``vsp -script`` with the script already
+    written in `casedir`, and the error is logged with its entry. Other
+    exceptions propagate. Logged entries of API runs carry no CPU times
+    or peak RSS, as the solver is not a child process this module waits
+    on.
+    """
+    vsp = _openvsp()
+    start = time.time()
+    try:
+        if reread:
+            vsp.ClearVSPModel()
+            vsp.ReadVSPFile(os.path.join(casedir, sweep_input.fname))
+            vsp.Update()
+        # Drop earlier sweeps so that the polar found is this one's
+        vsp.DeleteAllResults()
+        run_model(casedir, sweep_input, ncpu)
+        polar_dict = polar_results()
+    except api_errors(vsp) as error:
+        return _fallback(casedir, log_path, tags, repr(error))
+    end = time.time()
+
+    if not polar_dict:
+        return _fallback(casedir, log_path, tags,
+                         "no {0} results".format(POLAR_RESULTS))
+
+    if log_path is not None:
+        runlog.record(log_path, runlog.case_entry(
+            casedir, API_SCRIPT, start, end, 0, tags=tags))
+
+    return end - start
+
+
+def run_cases(casedir_list, sweep_input_list, max_workers=None,
+              log_path=runlog.RUN_LOG, tags=None):
+    """Run all cases and return their wall times in order.
+
+    A single case is solved in this process with the openvsp module, and
+    given `max_workers` threads (all available cores by default). Several
+    cases run as concurrent ``vsp -script`` processes, at most
+    `max_workers` at once, as the API holds a single model and would solve
+    them one after the other; so do all cases without the module.
+    """
+    if not available() or len(casedir_list) > 1:
+        return runner.run_cases(casedir_list, max_workers=max_workers,
+                                log_path=log_path, tags=tags)
+
+    if max_workers is None:
+        max_workers = runner.available_cores()
+
+    return [run_case(casedir, sweep_input, log_path, tags, ncpu=max_workers)
+            for casedir, sweep_input in zip(casedir_list, sweep_input_list)]
@@ -0,0 +1,301 @@
+"""Archive the results of every solved case in compressed columnar files.
+
+Every case is one .npz file, listed in the JSON lines index; the polar
+rows of all cases are also consolidated into one table (see read_table).
+"""
+import dataclasses
+import datetime
+import json
+import numbers
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from . import adb, history, lod, polar
+
+ARCHIVE_DIR = os.environ.get(
+    "VSPAERO_ARCHIVE_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "vspaero_tools",
+                 "archive"))
+INDEX_FILE = "index.jsonl"
+TABLE_FILE = "table.npz"
+TABLE_ENTRY = "polar/entry"
+POLAR_PREFIX = "polar/"
+
+_lock = threading.Lock()
+
+
+def _stack(case_list, table_attr):
+    # One column per name over all rows of all cases, plus the case number
+    column_dict = {"case": np.concatenate([
+        np.full(len(getattr(case, table_attr)), i)
+        for i, case in enumerate(case_list)])}
+    for name, index in case_list[0].columns.items():
+        column_dict[name] = np.concatenate([
+            getattr(case, table_attr)[:, index] for case in case_list])
+
+    return column_dict
+
+
+def case_arrays(casedir, fname, fields=False):
+    """Return the results in `casedir` as a flat dict of named arrays.
+
+    Keys are ``"polar/<column>"``, ``"lod/<column>"`` and
+    ``"history/<column>"``; spanload and history rows of all solver cases
+    are stacked, with ``"lod/case"`` and ``"history/case"`` numbering them,
+    and ``"lod_reference/<name>"`` holds the reference quantities of every
+    spanload case.
+    With `fields`, the vortex-loop circulation and the mesh of the .adb
+    file are added under ``"adb/..."``, with the loop Cp jumps as
+    ``"adb/delta_cp"`` once their lift is checked against the polar.
+    """
+    stem = os.path.join(casedir, fname[:-5] + "_DegenGeom")
+    array_dict = {}
+    if os.path.isfile(stem + ".polar"):
+        for name, values in polar.read_polar(stem + ".polar").items():
+            array_dict["polar/" + name] = values
+
+    if os.path.isfile(stem + ".lod"):
+        lod_case_list = lod.read_lod(stem + ".lod")
+        if lod_case_list:
+            for name, values in _stack(lod_case_list, "stations").items():
+                array_dict["lod/" + name] = values
+            for name in lod_case_list[0].reference:
+                array_dict["lod_reference/" + name] = np.array(
+                    [case.reference[name] for case in lod_case_list])
+
+    if os.path.isfile(stem + ".history"):
+        history_case_list = history.read_history(stem + ".history")
+        if history_case_list:
+            for name, values in _stack(history_case_list,
+                                       "iterations").items():
+                array_dict["history/" + name] = values
+
+    if fields and os.path.isfile(stem + ".adb"):
+        adb_file = adb.Adb(stem + ".adb")
+        array_dict["adb/nodes"] = np.array(adb_file.nodes)
+        array_dict["adb/connectivity"] = np.array(adb_file.connectivity)
+        array_dict["adb/case_header"] = np.array(adb_file.case_header)
+        array_dict["adb/circulation"] = np.array(adb_file.circulation)
+        cl = array_dict.get("polar/CL")
+        try:
+            adb_file.loop_edges()
+        except ValueError:
+            # Meshes with more vortex loops than quads
+            cl = None
+        if cl is not None and len(cl) == len(adb_file):
+            adb.check_lift(adb_file, cl)
+            array_dict["adb/delta_cp"] = adb_file.delta_cp()
+
+    return array_dict
+
+
+def case_inputs(case):
+    """Return the flat, JSON-ready inputs of a study.Case.
+
+    Geometry and mesh parameters are keyed ``"<group>.<parm>"`` and the
+    sweep inputs by their SweepInput field name.
+    """
+    input_dict = {"{0}.{1}".format(group, parm): value
+                  for parm, group, value in case.parms()}
+    input_dict.update(dataclasses.asdict(case.sweep_input))
+
+    return {name: value.item() if isinstance(value, np.generic) else value
+            for name, value in input_dict.items()}
+
+
+def store(study_name, case, casedir, case_key, fields=False,
+          archive_dir=ARCHIVE_DIR):
+    """Archive one solved case and index it; return the archive file path.
+
+    Every call adds a new file, so earlier runs of the same case are kept.
+    """
+    now = datetime.datetime.now()
+    relpath = os.path.join(study_name, case.name, "{0}-{1}.npz".format(
+        now.strftime("%Y%m%dT%H%M%S%f"), case_key[:12]))
+    path = os.path.join(archive_dir, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez_compressed(path, **case_arrays(
+        casedir, case.sweep_input.fname, fields))
+
+    entry = {"time": now.isoformat(), "study": study_name,
+             "case": case.name, "key": case_key, "file": relpath}
+    entry.update(case_inputs(case))
+    line = json.dumps(entry) + "\n"
+    with _lock:
+        with open(os.path.join(archive_dir, INDEX_FILE), "a") as file_object:
+            file_object.write(line)
+
+    return path
+
+
+def read_index(archive_dir=ARCHIVE_DIR, **match):
+    """Return the index entries whose fields equal every `match` value."""
+    entry_list = []
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    if not os.path.isfile(index_path):
+        return entry_list
+
+    with open(index_path) as file_object:
+        for line in file_object:
+            if line.strip():
+                entry = json.loads(line)
+                if all(entry.get(key) == value
+                       for key, value in match.items()):
+                    entry_list.append(entry)
+
+    return entry_list
+
+
+def load(entry, archive_dir=ARCHIVE_DIR):
+    """Return the lazily loaded arrays of one indexed case.
+
+    Only the members that are accessed are decompressed.
+    """
+    return np.load(os.path.join(archive_dir, entry["file"]))
+
+
+def _entry_columns(entry_list):
+    # Index fields as one array per field: floats with NaN where an entry
+    # lacks the field, or strings with "" (fields of other types are left
+    # to the entries)
+    column_dict = {}
+    for name in sorted({name for entry in entry_list for name in entry}):
+        value_list = [entry.get(name) for entry in entry_list]
+        present_list = [value for value in value_list if value is not None]
+        if all(isinstance(value, str) for value in present_list):
+            column_dict[name] = np.array(
+                ["" if value is None else value for value in value_list],
+                dtype=str)
+        elif all(isinstance(value, numbers.Real)
+                 for value in present_list):
+            column_dict[name] = np.array(
+                [np.nan if value is None else value for value in value_list],
+                dtype=float)
+
+    return column_dict
+
+
+def _polar_rows(entry_list, archive_dir, start):
+    # The stacked polar rows of the entries from `start` on
+    part_list = []
+    for i, entry in enumerate(entry_list[start:], start):
+        with load(entry, archive_dir) as npz:
+            part = {name: npz[name] for name in npz.files
+                    if name.startswith(POLAR_PREFIX)}
+        nrows = max((len(values) for values in part.values()), default=0)
+        part[TABLE_ENTRY] = np.full(nrows, i)
+        part_list.append(part)
+
+    return part_list
+
+
+def _concatenate(part_list):
+    nrows_list = [len(part[TABLE_ENTRY]) for part in part_list]
+    name_set = {name for part in part_list for name in part}
+
+    return {name: np.concatenate([
+        part[name] if name in part else np.full(nrows, np.nan)
+        for part, nrows in zip(part_list, nrows_list)])
+        for name in name_set}
+
+
+def read_table(archive_dir=ARCHIVE_DIR):
+    """Return every archived case as one dict of column arrays.
+
+    Index fields have one value per index entry, as floats or strings.
+    The ``"polar/<column>"`` arrays stack the polar rows of all
+    cases, with TABLE_ENTRY giving the entry number of every row. The
+    polar rows are kept in TABLE_FILE next to the index and extended
+    with the entries indexed since it was written, so only the files of
+    those cases are opened.
+    """
+    entry_list = read_index(archive_dir)
+    file_array = np.array([entry["file"] for entry in entry_list], dtype=str)
+    path = os.path.join(archive_dir, TABLE_FILE)
+
+    row_dict = {}
+    if os.path.isfile(path):
+        with np.load(path) as npz:
+            row_dict = dict(npz)
+    table_files = row_dict.pop("entry_files", np.array([], dtype=str))
+    if (len(table_files) > len(file_array)
+            or np.any(table_files != file_array[:len(table_files)])):
+        # The index was rewritten, so the table is rebuilt from scratch
+        row_dict = {}
+        table_files = table_files[:0]
+
+    if len(table_files) < len(file_array):
+        part_list = _polar_rows(entry_list, archive_dir, len(table_files))
+        if row_dict:
+            part_list.insert(0, row_dict)
+        row_dict = _concatenate(part_list)
+        # Every writer has a file of its own, so that concurrent processes
+        # never write to the same one before it replaces the table
+        fd, temp_path = tempfile.mkstemp(suffix=".npz", dir=archive_dir)
+        try:
+            with os.fdopen(fd, "wb") as file_object:
+                np.savez_compressed(file_object, entry_files=file_array,
+                                    **row_dict)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    column_dict = _entry_columns(entry_list)
+    column_dict.update(row_dict)
+    if TABLE_ENTRY not in column_dict:
+        column_dict[TABLE_ENTRY] = np.array([], dtype=int)
+
+    return column_dict
+
+
+def table(names, archive_dir=ARCHIVE_DIR, **match):
+    """Return columns of the polar rows of every matching archived case.
+
+    `names` are ``"polar/<column>"`` names or index fields, which are
+    repeated over the rows of their case; the rows are those of the cases
+    whose index fields equal every `match` value. Numeric fields are NaN
+    and string fields "" for cases without them, e.g. cases of another
+    wing type. Everything is read from read_table in one pass.
+    """
+    column_dict = read_table(archive_dir)
+    row_entry = column_dict[TABLE_ENTRY]
+    keep = np.ones(len(row_entry), dtype=bool)
+    for name, value in match.items():
+        if name not in column_dict:
+            keep[:] = False
+            break
+        keep &= column_dict[name][row_entry] == value
+
+    return {name: (column_dict[name][keep] if name.startswith(POLAR_PREFIX)
+                   or name == TABLE_ENTRY
+                   else column_dict[name][row_entry[keep]])
+            for name in names}
+
+
+def gather(entry_list, name, archive_dir=ARCHIVE_DIR):
+    """Return the array `name` of every entry, e.g. ``"polar/CL"``.
+
+    Polar columns come from read_table; other arrays are read from the
+    file of every case.
+    """
+    if not name.startswith(POLAR_PREFIX):
+        array_list = []
+        for entry in entry_list:
+            with load(entry, archive_dir) as npz:
+                array_list.append(npz[name])
+        return array_list
+
+    column_dict = read_table(archive_dir)
+    entry_index = {file_name: i
+                   for i, file_name in enumerate(column_dict["file"])}
+    # Rows are stored in entry order
+    offsets = np.searchsorted(column_dict[TABLE_ENTRY],
+                              np.arange(len(entry_index) + 1))
+    values = column_dict[name]
+
+    return [values[offsets[i]:offsets[i + 1]]
+            for i in (entry_index[entry["file"]] for entry in entry_list)]
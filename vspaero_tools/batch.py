@@ -0,0 +1,252 @@
+"""Merge compatible VSPAERO cases into one sweep and split the results."""
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+
+from collections import namedtuple
+
+import numpy as np
+
+from . import api, jobqueue, runner, vspscript
+from .polar import header_index
+
+BLOCK_SUFFIXES = (".lod", ".history")
+MAX_PADDING = 2
+
+BatchRun = namedtuple("BatchRun", ["times", "failed"])
+BatchRun.__doc__ = """Outcome of the merged sweeps of batch.run_cases.
+
+`times` holds the wall time of every merged sweep, None for sweeps the
+job queue never ran, and `failed` the case directories left without
+results.
+"""
+
+
+def sweep_alphas(sweep_input):
+    """Return the angles of attack solved by a sweep."""
+    return np.linspace(sweep_input.alpha_i, sweep_input.alpha_f,
+                       int(sweep_input.alpha_npts))
+
+
+def sweep_machs(sweep_input):
+    """Return the Mach numbers solved by a sweep."""
+    if sweep_input.mach_npts > 1:
+        return np.linspace(sweep_input.mach, sweep_input.mach_f,
+                           int(sweep_input.mach_npts))
+    return np.array([sweep_input.mach])
+
+
+def _grid(value_list, decimals=6):
+    # Smallest uniform grid holding every value, None when too sparse
+    values = np.unique(np.round(np.concatenate(value_list), decimals))
+    if values.size == 1:
+        return float(values[0]), float(values[0]), 1
+
+    step = np.min(np.diff(values))
+    index = (values - values[0])/step
+    npts = int(round(index[-1])) + 1
+    if (not np.allclose(index, np.round(index), atol=1e-6)
+            or npts > MAX_PADDING*values.size):
+        return None
+
+    return float(values[0]), float(values[-1]), npts
+
+
+def plan(sweep_input_list, geometry_list):
+    """Group cases that can be solved by a single VSPAERO sweep.
+
+    Cases are compatible when they share `fname`, geometry (any hashable
+    key in `geometry_list`, e.g. the ``SetParmValUpdate`` triples), CG,
+    reference chord and wake settings, and their alphas and Machs fit on
+    one uniform grid.
+    Return a list of ``(merged_sweep_input, member_index_list)``.
+    """
+    group_dict = {}
+    for i, (sweep_input, geometry) in enumerate(
+            zip(sweep_input_list, geometry_list)):
+        group_key = (geometry, sweep_input.fname, sweep_input.x_cg,
+                     sweep_input.y_cg, sweep_input.z_cg, sweep_input.cref,
+                     sweep_input.wake_iters, sweep_input.wake_nodes)
+        group_dict.setdefault(group_key, []).append(i)
+
+    batch_list = []
+    for index_list in group_dict.values():
+        member_list = [sweep_input_list[i] for i in index_list]
+        alpha_grid = _grid([sweep_alphas(member) for member in member_list])
+        mach_grid = _grid([sweep_machs(member) for member in member_list])
+        if alpha_grid is None or mach_grid is None:
+            batch_list.extend((sweep_input_list[i], [i]) for i in index_list)
+            continue
+
+        batch_list.append((dataclasses.replace(
+            member_list[0], alpha_i=alpha_grid[0], alpha_f=alpha_grid[1],
+            alpha_npts=alpha_grid[2], mach=mach_grid[0], mach_f=mach_grid[1],
+            mach_npts=mach_grid[2]), index_list))
+
+    return batch_list
+
+
+def _nearest(value, values):
+    return values[np.argmin(np.abs(values - value))]
+
+
+def _block_condition(block):
+    condition = {}
+    for line in block:
+        tokens = line.split()
+        if tokens[:1] in (["Mach_"], ["AoA_"]):
+            condition[tokens[0]] = float(tokens[1])
+
+    return condition["Mach_"], condition["AoA_"]
+
+
+def _split_blocks(path):
+    # Every case of a .lod or .history file opens with a line of asterisks
+    block_list = []
+    with open(path) as file_object:
+        for line in file_object:
+            if line.startswith("*") or not block_list:
+                block_list.append([])
+            block_list[-1].append(line)
+
+    return block_list
+
+
+def split(batchdir, sweep_input, member_list, casedir_list):
+    """Write the results of `member_list` from a merged run into their dirs.
+
+    Rows of the .polar file and case blocks of the .lod and .history files
+    are matched to the members by their Mach number and angle of attack,
+    snapped onto the grid of the merged `sweep_input` (VSPAERO reports a
+    zero Mach number as 0.001, for instance). Members missing any of their
+    rows are left alone; return the directories that were written.
+    """
+    alphas = sweep_alphas(sweep_input)
+    machs = sweep_machs(sweep_input)
+    stem = sweep_input.fname[:-5] + "_DegenGeom"
+
+    def snap(mach, alpha):
+        return (round(float(_nearest(mach, machs)), 6),
+                round(float(_nearest(alpha, alphas)), 6))
+
+    def member_conditions(member):
+        return [snap(mach, alpha) for mach in sweep_machs(member)
+                for alpha in sweep_alphas(member)]
+
+    with open(os.path.join(batchdir, stem + ".polar")) as file_object:
+        header = file_object.readline()
+        index = header_index(header)
+        row_dict = {}
+        for line in file_object:
+            tokens = line.split()
+            if tokens:
+                row_dict[snap(float(tokens[index["Mach"]]),
+                              float(tokens[index["AoA"]]))] = line
+
+    block_dict = {}
+    for suffix in BLOCK_SUFFIXES:
+        path = os.path.join(batchdir, stem + suffix)
+        if os.path.isfile(path):
+            block_dict[suffix] = {snap(*_block_condition(block)): block
+                                  for block in _split_blocks(path)}
+
+    written_list = []
+    for member, casedir in zip(member_list, casedir_list):
+        condition_list = member_conditions(member)
+        if any(condition not in row_dict for condition in condition_list):
+            continue
+
+        with open(os.path.join(casedir, stem + ".polar"), "w") as file_object:
+            file_object.write(header)
+            file_object.writelines(row_dict[condition]
+                                   for condition in condition_list)
+
+        for suffix, blocks in block_dict.items():
+            with open(os.path.join(casedir, stem + suffix),
+                      "w") as file_object:
+                for condition in condition_list:
+                    file_object.writelines(blocks.get(condition, []))
+        written_list.append(casedir)
+
+    return written_list
+
+
+def batch_key(sweep_input, geometry_list):
+    """Return a digest of a merged sweep and the geometry it is run on."""
+    payload = json.dumps([vspscript.render(sweep_input), geometry_list],
+                         default=str)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_cases(casedir_list, sweep_input_list, geometry_list, outputdir,
+              max_workers=None, queue_path=None, timeout=None,
+              progress=None):
+    """Run cases as merged sweeps and write each case's results to its dir.
+
+    Every case directory must already hold its .vsp3 file. Each merged
+    sweep runs in a scratch directory seeded with the .vsp3 file of its
+    first member, then its outputs are split back into the members'
+    directories. The cases of merged sweeps that failed or left no polar,
+    and those missing rows of it, are left without results. Return a
+    BatchRun of the wall times and of those cases.
+
+    With `queue_path`, the merged sweeps run as ``vsp`` processes from the
+    job queue in that file (see jobqueue.run_cases), killed after
+    `timeout` s, and `progress` is called with every attempt. Their
+    scratch directories are then named after their batch_key, so sweeps
+    finished by an interrupted run are reused.
+    """
+    batch_list = plan(sweep_input_list, geometry_list)
+
+    job_queue = None if queue_path is None else jobqueue.JobQueue(queue_path)
+    batchdir_list = []
+    for k, (sweep_input, index_list) in enumerate(batch_list):
+        if job_queue is None:
+            name = "batch-{0}".format(k)
+        else:
+            name = "batch-" + batch_key(
+                sweep_input, [geometry_list[i] for i in index_list])[:12]
+            batchdir = os.path.join(outputdir, runner.CASES_DIR, name)
+            if job_queue.finished(batchdir):
+                batchdir_list.append(batchdir)
+                continue
+
+        batchdir = runner.case_dir(outputdir, name, sweep_input)
+        shutil.copy2(
+            os.path.join(casedir_list[index_list[0]], sweep_input.fname),
+            batchdir)
+        batchdir_list.append(batchdir)
+
+    if job_queue is None:
+        time_list = api.run_cases(
+            batchdir_list, [sweep_input for sweep_input, _ in batch_list],
+            max_workers=max_workers)
+        solved_list = [os.path.isfile(os.path.join(
+            batchdir, sweep_input.fname[:-5] + "_DegenGeom.polar"))
+            for batchdir, (sweep_input, _) in zip(batchdir_list, batch_list)]
+    else:
+        job_queue.close()
+        time_list = jobqueue.run_cases(batchdir_list, queue_path,
+                                       max_workers=max_workers,
+                                       timeout=timeout, progress=progress)
+        job_queue = jobqueue.JobQueue(queue_path)
+        solved_list = [job_queue.finished(batchdir)
+                       for batchdir in batchdir_list]
+        job_queue.close()
+
+    failed_list = []
+    for batchdir, solved, (sweep_input, index_list) in zip(
+            batchdir_list, solved_list, batch_list):
+        member_list = [casedir_list[i] for i in index_list]
+        written_list = []
+        if solved:
+            written_list = split(batchdir, sweep_input,
+                                 [sweep_input_list[i] for i in index_list],
+                                 member_list)
+        failed_list.extend(casedir for casedir in member_list
+                           if casedir not in written_list)
+
+    return BatchRun(time_list, failed_list)
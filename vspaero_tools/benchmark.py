@@ -0,0 +1,179 @@
+"""Measure solver throughput against panel count and worker count.
+
+Every benchmark point solves the same case a fixed number of times and
+appends its latency and throughput to a JSON lines file. The cases run
+through api.run_cases as the studies solve them, or as concurrent
+``vsp -script`` processes, and each entry names the backend it used and
+the commit, OpenVSP version and host it was measured on, so results can
+be compared across them.
+"""
+import dataclasses
+import datetime
+import glob
+import os
+import platform
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+from . import adb, api, geometry, runlog, runner, study
+
+RESULTS_FILE = os.path.join("output", "benchmark.jsonl")
+MESH_LEVELS = ((17, 12), (33, 24), (65, 48))
+API_BACKEND = "api"
+SCRIPT_BACKEND = "script"
+BACKENDS = (API_BACKEND, SCRIPT_BACKEND)
+
+
+def worker_counts(max_workers=None):
+    """Return the powers of two up to `max_workers`, and `max_workers`."""
+    if max_workers is None:
+        max_workers = runner.available_cores()
+    count_list = [2**i for i in range(max_workers.bit_length())
+                  if 2**i < max_workers]
+
+    return tuple(count_list) + (max_workers,)
+
+
+def commit():
+    """Return the git commit of the working tree, or None outside git."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Return the fields that identify where and on what a run happened."""
+    return {"commit": commit(), "openvsp": study.solver_version(),
+            "host": platform.node(), "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cores": runner.available_cores()}
+
+
+def _mesh_size(casedir):
+    adb_list = glob.glob(os.path.join(casedir, "*.adb"))
+    if not adb_list:
+        return None, None
+
+    header = adb.read_header(adb_list[0])
+    return int(header["ntris"]), int(header["nloops"])
+
+
+def run_point(session, name, case, outputdir, ncases, max_workers,
+              log_path=None, backend=API_BACKEND):
+    """Solve `ncases` copies of `case` on `max_workers` and time them.
+
+    With API_BACKEND the cases run through api.run_cases as the studies
+    run them: in this process with `max_workers` threads for a single
+    case, and as concurrent ``vsp`` processes for several cases or when
+    the openvsp module is missing. With SCRIPT_BACKEND they run as
+    `max_workers` concurrent ``vsp`` processes. Return the benchmark
+    entry: the backend actually used, the mean and maximum latency of a
+    case, the wall time of the batch, the number of cases per hour and
+    the panel count of the mesh.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend {0}".format(backend))
+
+    session.apply(case)
+    casedir_list = []
+    for i in range(ncases):
+        casedir = runner.case_dir(
+            outputdir, "bench-{0}-{1}".format(name.replace("/", "_"), i),
+            case.sweep_input)
+        if casedir_list:
+            shutil.copy2(os.path.join(casedir_list[0],
+                                      case.sweep_input.fname), casedir)
+        else:
+            session.write(os.path.join(casedir, case.sweep_input.fname))
+        casedir_list.append(casedir)
+
+    if backend == API_BACKEND and (ncases > 1 or not api.available()):
+        backend = SCRIPT_BACKEND
+    start = time.time()
+    if backend == API_BACKEND:
+        latency_list = api.run_cases(
+            casedir_list, [case.sweep_input]*ncases, max_workers=max_workers,
+            log_path=log_path)
+    else:
+        latency_list = runner.run_cases(
+            casedir_list, max_workers=max_workers, log_path=log_path)
+    wall_time = time.time() - start
+    tris, loops = _mesh_size(casedir_list[0])
+
+    return {"geometry": name, "backend": backend,
+            "chordwise_tess": case.mesh.chordwise_tess,
+            "spanwise_tess": case.mesh.spanwise_tess,
+            "tris": tris, "loops": loops,
+            "alpha_npts": case.sweep_input.alpha_npts,
+            "workers": max_workers, "cases": ncases,
+            "latency_mean": float(np.mean(latency_list)),
+            "latency_max": float(np.max(latency_list)),
+            "wall_time": wall_time,
+            "cases_per_hour": ncases*3600/wall_time}
+
+
+def run(case_dict, outputdir=study.OUTPUT_DIR, levels=MESH_LEVELS,
+        workers=None, ncases=None, results_path=RESULTS_FILE,
+        backends=(API_BACKEND,)):
+    """Benchmark every case of `case_dict` on every mesh and worker count.
+
+    `case_dict` maps a geometry name to a study.Case; its mesh is refined
+    to each ``(chordwise_tess, spanwise_tess)`` pair of `levels`. Every
+    point solves `ncases` cases, by default as many as the largest worker
+    count, so the work stays constant as the workers change, and with
+    each of `backends`. Entries are appended to `results_path` as they
+    finish and returned as a list.
+    """
+    workers = worker_counts() if workers is None else tuple(workers)
+    if ncases is None:
+        ncases = max(workers)
+
+    session = geometry.Session()
+    fields = environment()
+    fields["time"] = datetime.datetime.now().isoformat()
+    entry_list = []
+    for name, case in case_dict.items():
+        for chordwise_tess, spanwise_tess in levels:
+            level_case = dataclasses.replace(
+                case, mesh=dataclasses.replace(
+                    case.mesh, chordwise_tess=chordwise_tess,
+                    spanwise_tess=spanwise_tess))
+            for backend in backends:
+                for max_workers in workers:
+                    entry = dict(fields)
+                    entry.update(run_point(
+                        session, name, level_case, outputdir, ncases,
+                        max_workers, backend=backend))
+                    runlog.record(results_path, entry)
+                    entry_list.append(entry)
+
+    return entry_list
+
+
+def point_key(entry):
+    """Return what identifies a benchmark point across runs.
+
+    Entries recorded before backends were told apart ran as scripts.
+    """
+    return (entry["geometry"], entry.get("backend", SCRIPT_BACKEND),
+            entry["chordwise_tess"], entry["spanwise_tess"],
+            entry["workers"], entry["cases"])
+
+
+def compare(baseline_list, entry_list, field="cases_per_hour"):
+    """Return the ratio of `field` over its baseline for every point.
+
+    Points are matched with point_key; when a point was measured more
+    than once, its latest entry is used.
+    """
+    baseline_dict = {point_key(entry): entry for entry in baseline_list}
+
+    return {point_key(entry): entry[field]/baseline_dict[point_key(entry)][
+        field] for entry in entry_list if point_key(entry) in baseline_dict}
@@ -0,0 +1,110 @@
+"""Content-addressed on-disk cache of VSPAERO results."""
+import hashlib
+import json
+import numbers
+import os
+import shutil
+
+from . import vspscript
+
+CACHE_DIR = os.environ.get(
+    "VSPAERO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "vspaero_tools"))
+MAX_BYTES = 1 << 30
+RESULT_SUFFIXES = (".polar", ".lod", ".history")
+
+
+def _normalize(value):
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def key(parm_list, sweep_input, solver_version):
+    """Return the hex digest identifying the results of one VSPAERO run.
+
+    `parm_list` holds the ``(parm, group, value)`` triples applied to the
+    geometry with ``SetParmValUpdate``, including tessellation and
+    clustering. `sweep_input` is hashed through its rendered script, so any
+    change to the alpha, Mach, CG or reference inputs changes the key.
+    """
+    payload = json.dumps({
+        "parms": [[parm, group, _normalize(value)]
+                  for parm, group, value in parm_list],
+        "script": vspscript.render(sweep_input),
+        "version": solver_version,
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _entry_dir(case_key, cache_dir):
+    return os.path.join(cache_dir, case_key)
+
+
+def restore(case_key, outputdir, cache_dir=CACHE_DIR):
+    """Copy cached results into `outputdir` and return True on a hit."""
+    entrydir = _entry_dir(case_key, cache_dir)
+    if not os.path.isdir(entrydir):
+        return False
+
+    os.makedirs(outputdir, exist_ok=True)
+    for fname in os.listdir(entrydir):
+        shutil.copy2(os.path.join(entrydir, fname), outputdir)
+
+    # The entry modification time doubles as its last-use time
+    os.utime(entrydir)
+
+    return True
+
+
+def store(case_key, outputdir, cache_dir=CACHE_DIR,
+          suffixes=RESULT_SUFFIXES, max_bytes=MAX_BYTES):
+    """Cache the result files of `outputdir` under `case_key`.
+
+    Only files ending in one of `suffixes` are kept. The entry is written
+    next to its final location and renamed into place, so a concurrent
+    reader never sees a partial entry. Least recently used entries are then
+    evicted until the cache fits in `max_bytes`.
+    """
+    entrydir = _entry_dir(case_key, cache_dir)
+    tmpdir = "{0}.tmp-{1}".format(entrydir, os.getpid())
+    if os.path.isdir(tmpdir):
+        shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+
+    for fname in os.listdir(outputdir):
+        if fname.endswith(suffixes):
+            shutil.copy2(os.path.join(outputdir, fname), tmpdir)
+
+    try:
+        os.rename(tmpdir, entrydir)
+    except OSError:
+        # Another process stored the same results first
+        shutil.rmtree(tmpdir)
+
+    evict(cache_dir, max_bytes)
+
+    return entrydir
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, fname))
+               for fname in os.listdir(path))
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    """Delete least recently used entries until the cache fits."""
+    entry_list = []
+    for name in os.listdir(cache_dir):
+        entrydir = os.path.join(cache_dir, name)
+        if ".tmp-" not in name and os.path.isdir(entrydir):
+            entry_list.append((os.path.getmtime(entrydir),
+                               _dir_size(entrydir), entrydir))
+
+    total = sum(size for _, size, _ in entry_list)
+    for _, size, entrydir in sorted(entry_list):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entrydir, ignore_errors=True)
+        total -= size
@@ -0,0 +1,170 @@
+"""Catalog of the experimental reference data of the validation studies.
+
+The ``.dat`` files listed in SOURCES are parsed, sorted and decimated once
+into a single binary catalog, which is rebuilt only when a source file or
+SOURCES itself changes. Datasets are then looked up by key.
+"""
+import functools
+import hashlib
+import json
+import os
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+ROOTDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG_PATH = os.path.join(ROOTDIR, "references", "catalog.npz")
+
+
+@dataclass(frozen=True)
+class Source:
+    """A reference data file and how to read one dataset from it.
+
+    `path` is relative to the repository root and its first line names the
+    columns; `x` and `y` pick two of them. Rows are sorted on `x` (then
+    `y`), every `step`-th one is kept, and the kept rows sharing an `x`
+    are merged into their mean `y`. `report`, `reynolds` and `mach` describe the experiment where
+    they are known, and are None otherwise.
+    """
+
+    path: str
+    x: str
+    y: str
+    step: int = 1
+    report: str = None
+    reynolds: float = None
+    mach: float = None
+
+
+# The valcs_4 and valcs_5 wings are those of the NACA reports in
+# references/paper_1, and valcs_5 runs at the Mach number of its test
+R1208 = "NACA Report R-1208"
+TN1422 = "NACA TN 1422"
+TN1422_MACH = 0.17
+
+SOURCES = {
+    "valcs_4/CL": Source("valcs_4/data/CL.dat", "alpha", "CL",
+                         report=R1208),
+    "valcs_4/CM": Source("valcs_4/data/CM.dat", "CL", "CM", report=R1208),
+    "valcs_4/cldist": Source("valcs_4/data/cldist.dat", "yloc", "cl",
+                             report=R1208),
+}
+SOURCES.update({
+    "valcs_5/{0}_wsh{1}".format(name, washout): Source(
+        "valcs_5/data/{0}_wsh{1}.dat".format(name, washout), x, y,
+        report=TN1422, mach=TN1422_MACH)
+    for name, x, y in (("CL", "alpha", "CL"), ("CM", "CL", "CM"),
+                       ("cldist", "yloc", "cl"))
+    for washout in (0, 2)})
+# Every other row of the lift curves of valcs_6 and valcs_7 is dropped
+SOURCES.update({
+    "valcs_6/AR{0}".format(ar): Source(
+        "valcs_6/data/AR{0}.dat".format(ar), "alpha", "CL", step=2)
+    for ar in (2, 3, 4, 5)})
+SOURCES.update({
+    "valcs_7/TR{0}".format(tr): Source(
+        "valcs_7/data/TR{0}.dat".format(tr), "alpha", "CL", step=2)
+    for tr in (50, 75, 100)})
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Sorted reference points with a precomputed linear interpolant.
+
+    `slope` holds the slope of every segment between consecutive points;
+    calling the dataset interpolates, and extrapolates beyond its ends.
+    """
+
+    key: str
+    x: np.ndarray
+    y: np.ndarray
+    slope: np.ndarray
+    source: Source
+
+    def __call__(self, x_new):
+        index = np.clip(np.searchsorted(self.x, x_new, side="right"),
+                        1, len(self.x) - 1) - 1
+
+        return self.y[index] + self.slope[index]*(x_new - self.x[index])
+
+
+def _manifest_digest(sources):
+    payload = json.dumps({key: asdict(source)
+                          for key, source in sources.items()},
+                         sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def read_source(source, rootdir=ROOTDIR):
+    """Parse, sort, decimate and merge one source; return its (x, y)."""
+    path = os.path.join(rootdir, source.path)
+    with open(path) as file_object:
+        names = file_object.readline().split()
+        data_array = np.loadtxt(file_object, ndmin=2)
+    x = data_array[:, names.index(source.x)]
+    y = data_array[:, names.index(source.y)]
+    order = np.lexsort((y, x))[::source.step]
+
+    # Repeated x would give segments of zero width and undefined slope
+    x, inverse = np.unique(x[order], return_inverse=True)
+
+    return x, np.bincount(inverse, weights=y[order])/np.bincount(inverse)
+
+
+def build(path=CATALOG_PATH, sources=None, rootdir=ROOTDIR):
+    """Ingest every source into the binary catalog at `path`."""
+    sources = SOURCES if sources is None else sources
+    array_dict = {"manifest": np.array(_manifest_digest(sources))}
+    for key, source in sources.items():
+        x, y = read_source(source, rootdir)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.diff(y)/np.diff(x)
+        array_dict[key + "/x"] = x
+        array_dict[key + "/y"] = y
+        array_dict[key + "/slope"] = slope
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **array_dict)
+
+
+def _stale(path, sources, rootdir):
+    if not os.path.isfile(path):
+        return True
+
+    mtime = os.path.getmtime(path)
+    if any(os.path.getmtime(os.path.join(rootdir, source.path)) > mtime
+           for source in sources.values()):
+        return True
+
+    with np.load(path) as npz:
+        return str(npz["manifest"]) != _manifest_digest(sources)
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path, rootdir):
+    if _stale(path, SOURCES, rootdir):
+        build(path, SOURCES, rootdir)
+
+    dataset_dict = {}
+    with np.load(path) as npz:
+        for key, source in SOURCES.items():
+            dataset_dict[key] = Dataset(
+                key, npz[key + "/x"], npz[key + "/y"], npz[key + "/slope"],
+                source)
+
+    return dataset_dict
+
+
+def load(path=CATALOG_PATH, rootdir=ROOTDIR):
+    """Return every dataset keyed by name, building the catalog if stale.
+
+    The result is memoized, so each process reads the catalog once.
+    """
+    return _load(path, rootdir)
+
+
+def get(key):
+    """Return one dataset of the catalog."""
+    return load()[key]
@@ -0,0 +1,184 @@
+"""Refine a mesh parameter until the solver coefficients converge."""
+import json
+import math
+import os
+import time
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+MAX_ORDER_ITERATIONS = 50
+
+
+@dataclass
+class ConvergenceResult:
+    """Outcome of a convergence study.
+
+    `levels` are the tessellations actually solved and `values` maps every
+    coefficient name to its array of results on those levels.
+    `extrapolated` holds the Richardson estimate of each coefficient on an
+    infinitely fine mesh (the finest value when no estimate exists) and
+    `order` the observed order of convergence behind it. `times` holds
+    the wall time in s that solving each level took.
+    """
+
+    levels: np.ndarray
+    values: dict
+    times: np.ndarray = None
+    converged: bool = False
+    extrapolated: dict = field(default_factory=dict)
+    order: dict = field(default_factory=dict)
+
+
+def observed_order(levels, values):
+    """Return the observed order of the last three values, or None.
+
+    `levels` are tessellation counts, so the mesh size is taken as their
+    inverse. The refinement ratios may differ; the order is then found by
+    fixed-point iteration as in the grid convergence index procedure.
+    """
+    h3, h2, h1 = (1/float(level) for level in levels[-3:])
+    f3, f2, f1 = (float(value) for value in values[-3:])
+    e21 = f2 - f1
+    e32 = f3 - f2
+    if e21 == 0 or e32 == 0 or e32/e21 < 0:
+        # Oscillating or already exact: no monotone asymptotic range
+        return None
+
+    r21 = h2/h1
+    r32 = h3/h2
+    order = abs(math.log(abs(e32/e21)))/math.log(r21)
+    for _ in range(MAX_ORDER_ITERATIONS):
+        try:
+            q = math.log((r21**order - 1)/(r32**order - 1))
+        except (ArithmeticError, ValueError):
+            return None
+        new_order = abs(math.log(abs(e32/e21)) + q)/math.log(r21)
+        if abs(new_order - order) < 1e-6:
+            return new_order
+        order = new_order
+
+    return None
+
+
+def richardson(levels, values, order):
+    """Extrapolate the finest value to zero mesh size."""
+    r21 = float(levels[-1])/float(levels[-2])
+
+    return values[-1] + (values[-1] - values[-2])/(r21**order - 1)
+
+
+def read_checkpoint(path, fingerprint=None):
+    """Return the levels solved in a checkpoint file, keyed by level.
+
+    Each value is a ``(values, time)`` pair. A checkpoint written for
+    another `fingerprint` holds nothing, and a line cut short by a crash
+    is ignored.
+    """
+    checkpoint_dict = {}
+    if not os.path.isfile(path):
+        return checkpoint_dict
+
+    with open(path) as file_object:
+        for line in file_object:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry["fingerprint"] == fingerprint:
+                checkpoint_dict[float(entry["level"])] = (entry["values"],
+                                                          entry["time"])
+
+    return checkpoint_dict
+
+
+def _write_checkpoint(path, fingerprint, level, values, wall_time):
+    # Flushed to disk before the next level starts, so a crash loses at
+    # most the level being solved
+    line = json.dumps({"fingerprint": fingerprint, "level": float(level),
+                       "values": values, "time": wall_time}, default=float)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as file_object:
+        file_object.write(line + "\n")
+        file_object.flush()
+        os.fsync(file_object.fileno())
+
+
+def converge(solve, levels, tolerance=0.01, min_levels=3, checkpoint=None,
+             fingerprint=None):
+    """Solve increasingly fine `levels` until every coefficient converges.
+
+    `solve` takes one level and returns a dict of coefficient values. After
+    each level, a coefficient has converged when its finest value lies
+    within `tolerance` (relative) of its Richardson extrapolation, or, when
+    no monotone trend exists, of its previous value. The remaining levels
+    are skipped once every coefficient has converged.
+
+    With a `checkpoint` path, every solved level is appended to that file
+    as soon as it finishes, and levels already recorded there for the same
+    `fingerprint` (e.g. a cache.key of the fixed inputs) are not solved
+    again, so an interrupted study resumes at its first unsolved level.
+    """
+    checkpoint_dict = {}
+    if checkpoint is not None:
+        checkpoint_dict = read_checkpoint(checkpoint, fingerprint)
+
+    level_list = []
+    value_dict = {}
+    time_list = []
+    result = ConvergenceResult(np.array([]), {}, np.array([]))
+    for level in levels:
+        if float(level) in checkpoint_dict:
+            values, wall_time = checkpoint_dict[float(level)]
+        else:
+            start = time.time()
+            values = solve(level)
+            wall_time = time.time() - start
+            if checkpoint is not None:
+                _write_checkpoint(checkpoint, fingerprint, level, values,
+                                  wall_time)
+
+        level_list.append(level)
+        time_list.append(wall_time)
+        for name, value in values.items():
+            value_dict.setdefault(name, []).append(value)
+
+        result = _assess(level_list, value_dict, time_list, tolerance,
+                         min_levels)
+        if result.converged:
+            break
+
+    return result
+
+
+def _assess(level_list, value_dict, time_list, tolerance, min_levels):
+    result = ConvergenceResult(
+        np.array(level_list),
+        {name: np.array(value_list)
+         for name, value_list in value_dict.items()},
+        np.array(time_list))
+    if len(level_list) < 2:
+        return result
+
+    converged = len(level_list) >= min_levels
+    for name, value_list in value_dict.items():
+        order = None
+        if len(level_list) >= 3:
+            order = observed_order(level_list, value_list)
+
+        if order:
+            reference = richardson(level_list, value_list, order)
+        else:
+            reference = value_list[-2]
+
+        result.order[name] = order
+        result.extrapolated[name] = reference if order else value_list[-1]
+
+        scale = abs(reference) or 1.0
+        if abs(value_list[-1] - reference)/scale > tolerance:
+            converged = False
+
+    result.converged = converged
+
+    return result
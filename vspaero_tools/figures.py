@@ -0,0 +1,87 @@
+"""Render study figures from archived results on a pool of processes.
+
+Worker processes draw with a non-interactive backend. Each one imports the
+script that defines a study once and reuses it for every figure of that
+study it renders.
+"""
+import functools
+import importlib.util
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import archive
+
+BACKEND = "Agg"
+
+
+def load_script(path):
+    """Import a Python script by path and return it as a module."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+@functools.lru_cache(maxsize=None)
+def _script_study(path):
+    return load_script(path).STUDY
+
+
+def case_results(source):
+    """Return the result arrays of a case as a dict.
+
+    `source` is an ``(npz_path, casedir, fname)`` triple: the archive file
+    of the case is read when `npz_path` is given, otherwise the result
+    files in `casedir`, with the keys of archive.case_arrays either way.
+    """
+    npz_path, casedir, fname = source
+    if npz_path is not None:
+        with np.load(npz_path) as npz:
+            return dict(npz)
+
+    return archive.case_arrays(casedir, fname)
+
+
+def _use_backend():
+    import matplotlib
+
+    matplotlib.use(BACKEND)
+
+
+def render_figure(script, name, source_dict, path):
+    """Draw the figure `name` of the study of `script` and save it as PDF.
+
+    `source_dict` maps every case name to its case_results source.
+    """
+    import matplotlib.pyplot as plt
+
+    valcs_study = _script_study(script)
+    figure = next(figure for figure in valcs_study.figures
+                  if figure.name == name)
+    results = {case_name: case_results(source)
+               for case_name, source in source_dict.items()}
+
+    fig = figure.plot(valcs_study, results, *figure.args)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, format="pdf", bbox_inches="tight")
+    plt.close(fig)
+
+    return path
+
+
+def render_all(task_list, max_workers=None):
+    """Run render_figure for every ``(script, name, sources, path)`` task.
+
+    Return the saved paths in order.
+    """
+    if not task_list:
+        return []
+
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_use_backend) as executor:
+        return list(executor.map(render_figure, *zip(*task_list)))
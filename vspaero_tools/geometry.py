@@ -0,0 +1,78 @@
+"""Keep one live OpenVSP model and move it from case to case."""
+
+
+class Session:
+    """A live OpenVSP wing that is updated in place between cases.
+
+    apply() rebuilds the model only when the structure of the wing changes,
+    that is its driver group, cross-section shape or the set of parameters
+    it sets; otherwise only the parameters whose value differs from the
+    live model are set. The model is serialized only by write(), when the
+    solver needs a ``.vsp3`` file.
+    """
+
+    def __init__(self):
+        # Imported here so that planning and reporting do not need OpenVSP
+        import openvsp
+
+        self.vsp = openvsp
+        self.wing_id = None
+        self.structure = None
+
+    @staticmethod
+    def _parm_list(case):
+        return case.wing.parms + case.wing.xsec_parms + case.mesh.parms()
+
+    def _structure(self, case):
+        parm_keys = tuple((parm, group)
+                          for parm, group, _ in self._parm_list(case))
+
+        return case.wing.driver_group, case.wing.xsec_shape, parm_keys
+
+    def _build(self, case):
+        vsp = self.vsp
+        vsp.ClearVSPModel()
+        self.wing_id = vsp.AddGeom("WING")
+
+        wing = case.wing
+        if wing.driver_group is not None:
+            vsp.SetDriverGroup(self.wing_id, 1, *[
+                getattr(vsp, driver) for driver in wing.driver_group])
+        for parm, group, value in wing.parms:
+            vsp.SetParmValUpdate(self.wing_id, parm, group, value)
+
+        if wing.xsec_shape is not None:
+            xsec_surf = vsp.GetXSecSurf(self.wing_id, 0)
+            vsp.ChangeXSecShape(xsec_surf, 0, getattr(vsp, wing.xsec_shape))
+            vsp.ChangeXSecShape(xsec_surf, 1, getattr(vsp, wing.xsec_shape))
+            vsp.Update()
+        for parm, group, value in wing.xsec_parms + case.mesh.parms():
+            vsp.SetParmValUpdate(self.wing_id, parm, group, value)
+        vsp.Update()
+
+    def apply(self, case):
+        """Bring the live model to the geometry and mesh of `case`.
+
+        Return the number of parameters set, or None after a rebuild.
+        """
+        structure = self._structure(case)
+        if structure != self.structure:
+            self._build(case)
+            self.structure = structure
+            return None
+
+        vsp = self.vsp
+        count = 0
+        for parm, group, value in self._parm_list(case):
+            if vsp.GetParmVal(self.wing_id, parm, group) != value:
+                vsp.SetParmValUpdate(self.wing_id, parm, group, value)
+                count += 1
+        if count:
+            vsp.Update()
+
+        return count
+
+    def write(self, path):
+        """Serialize the live model to a ``.vsp3`` file at `path`."""
+        self.vsp.WriteVSPFile(path, self.vsp.SET_ALL)
+        self.vsp.Update()
@@ -0,0 +1,149 @@
+"""Parse VSPAERO .history files and assess the wake iteration convergence."""
+from collections import namedtuple
+
+import numpy as np
+
+from .polar import header_index
+
+HISTORY_FIELDS = ("CL", "CDi", "L/D")
+# NumWakeNodes of a sweep that does not set it
+DEFAULT_WAKE_NODES = 64
+
+HistoryCase = namedtuple("HistoryCase", ["case", "reference", "columns",
+                                         "iterations"])
+HistoryCase.__doc__ = """Iteration history of one solver case.
+
+`case` is the solver case number, `reference` maps the reference
+quantities to their values, `columns` maps the iteration column names
+(``"Iter"``, ``"CL"``, ``"CDi"``, ``"L/D"``, ...) to their index and
+`iterations` holds one row per wake iteration.
+"""
+
+
+def iter_history(path):
+    """Yield a HistoryCase for every case of a .history file in one pass."""
+    with open(path) as file_object:
+        reference = None
+        case = None
+        for line in file_object:
+            tokens = line.split()
+            if line.startswith("# Name"):
+                reference = {}
+                for line in file_object:
+                    tokens = line.split()
+                    if not tokens:
+                        break
+                    reference[tokens[0].rstrip("_")] = float(tokens[1])
+
+            elif tokens[:2] == ["Solver", "Case:"]:
+                case = int(tokens[2])
+
+            elif case is not None and tokens[:1] == ["Iter"]:
+                columns = header_index(line)
+                iteration_lines = []
+                for line in file_object:
+                    if not line.strip():
+                        break
+                    iteration_lines.append(line)
+
+                yield HistoryCase(case, reference, columns,
+                                  np.loadtxt(iteration_lines, ndmin=2))
+                case = None
+
+
+def read_history(path):
+    """Return the list of every HistoryCase of a .history file."""
+    return list(iter_history(path))
+
+
+def from_columns(column_dict):
+    """Rebuild the HistoryCase list of stacked iteration columns.
+
+    `column_dict` maps every column name to its values over all cases,
+    with ``"case"`` numbering the rows as archive.case_arrays stores them
+    (without the ``"history/"`` prefix). The reference quantities are not
+    stored and are left None.
+    """
+    name_list = [name for name in column_dict if name != "case"]
+    columns = {name: i for i, name in enumerate(name_list)}
+    iterations = np.column_stack([column_dict[name] for name in name_list])
+    case_numbers = np.asarray(column_dict["case"])
+
+    return [HistoryCase(int(case) + 1, None, columns,
+                        iterations[case_numbers == case])
+            for case in np.unique(case_numbers)]
+
+
+def read_settings(path):
+    """Return the ``key = value`` settings of a .vspaero file as strings."""
+    setting_dict = {}
+    with open(path) as file_object:
+        for line in file_object:
+            key, sep, value = line.partition("=")
+            if sep:
+                setting_dict[key.strip()] = value.strip()
+
+    return setting_dict
+
+
+def converged_iteration(history_case, fields=HISTORY_FIELDS, rtol=1e-3,
+                        atol=1e-5):
+    """Return the first iteration from which every field stays settled.
+
+    A field is settled at an iteration when it and all later iterations lie
+    within ``atol + rtol*|final|`` of the final value. Return None when the
+    last iteration still moved by more than that, i.e. the case needs more
+    wake iterations than it was given.
+    """
+    iterations = history_case.iterations
+    settled = np.ones(len(iterations), dtype=bool)
+    for name in fields:
+        values = iterations[:, history_case.columns[name]]
+        within = np.abs(values - values[-1]) <= atol + rtol*np.abs(values[-1])
+        # Settled only if every later iteration is within tolerance too
+        settled &= np.logical_and.accumulate(within[::-1])[::-1]
+
+    first = int(np.argmax(settled))
+    if first == len(iterations) - 1 and len(iterations) > 1:
+        return None
+
+    return int(iterations[first, history_case.columns["Iter"]])
+
+
+def recommend_wake_iters(history_case_list, **kwargs):
+    """Return the wake iterations needed by the slowest case, or None.
+
+    Call it once per geometry class, with the histories of the cases that
+    belong to that class; keyword arguments go to converged_iteration.
+    None means some case had not converged and needs more iterations.
+    """
+    iteration_list = [converged_iteration(history_case, **kwargs)
+                      for history_case in history_case_list]
+    if None in iteration_list:
+        return None
+
+    return max(iteration_list)
+
+
+def final_values(history_case_list, fields=HISTORY_FIELDS):
+    """Return the (case, field) array of last-iteration values."""
+    return np.array([
+        [history_case.iterations[-1, history_case.columns[name]]
+         for name in fields]
+        for history_case in history_case_list])
+
+
+def recommend_wake_nodes(result_dict, fields=HISTORY_FIELDS, rtol=1e-3,
+                         atol=1e-5):
+    """Return the fewest wake nodes that match the finest wake.
+
+    `result_dict` maps each tried ``NumWakeNodes`` to the HistoryCase list
+    of a run with it. The final iteration of every case is compared with
+    the run using the most wake nodes.
+    """
+    node_list = sorted(result_dict)
+    finest = final_values(result_dict[node_list[-1]], fields)
+    for num_wake_nodes in node_list:
+        values = final_values(result_dict[num_wake_nodes], fields)
+        if np.all(np.abs(values - finest) <= atol + rtol*np.abs(finest)):
+            return num_wake_nodes
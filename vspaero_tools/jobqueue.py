@@ -0,0 +1,237 @@
+"""Supervise ``vsp`` processes from a resumable job queue.
+
+A job is a case directory holding a VSPAERO script. The state of every job
+is kept in a SQLite file, so an interrupted campaign resumes where it
+stopped: finished jobs are not run again and jobs that were left running
+are queued again.
+"""
+import asyncio
+import glob
+import os
+import sqlite3
+import time
+
+from collections import namedtuple
+
+from . import runlog, runner, vspscript
+
+QUEUE_FILE = "queue.sqlite"
+MAX_RETRIES = 2
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Job = namedtuple("Job", ["casedir", "script", "state", "attempts",
+                         "returncode", "wall_time"])
+Job.__doc__ = """One queued solver run and the outcome of its last attempt.
+
+`returncode` is None for a run that was killed at its timeout.
+"""
+
+Progress = namedtuple("Progress", ["casedir", "state", "attempt",
+                                   "returncode", "wall_time", "done",
+                                   "failed", "total"])
+Progress.__doc__ = """Outcome of one attempt and the totals of the campaign.
+
+`state` is DONE, FAILED, or PENDING when the job will be retried; `done`
+and `failed` count the jobs of the campaign finished so far, out of
+`total`.
+"""
+
+
+def succeeded(casedir, returncode):
+    """Return whether a run exited cleanly and left a polar behind."""
+    return returncode == 0 and bool(
+        glob.glob(os.path.join(casedir, "*.polar")))
+
+
+class JobQueue:
+    """States of the jobs of a campaign, stored in a SQLite file."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "casedir TEXT PRIMARY KEY, script TEXT NOT NULL, "
+                "state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "returncode INTEGER, wall_time REAL, updated REAL)")
+            # Runs cut short by an interrupted campaign start over
+            self.connection.execute(
+                "UPDATE jobs SET state = ? WHERE state = ?",
+                (PENDING, RUNNING))
+
+    def close(self):
+        """Close the SQLite file."""
+        self.connection.close()
+
+    def add(self, casedir_list, script=vspscript.VSPSCRIPT):
+        """Queue the cases; cases queued before keep their state."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO jobs (casedir, script, state) "
+                "VALUES (?, ?, ?)",
+                [(os.path.abspath(casedir), script, PENDING)
+                 for casedir in casedir_list])
+
+    def job(self, casedir):
+        """Return the Job of a case, or None if it was never queued."""
+        row = self.connection.execute(
+            "SELECT casedir, script, state, attempts, returncode, wall_time "
+            "FROM jobs WHERE casedir = ?",
+            (os.path.abspath(casedir),)).fetchone()
+
+        return None if row is None else Job(*row)
+
+    def finished(self, casedir):
+        """Return whether a case is done and its results are still there."""
+        job = self.job(casedir)
+        return (job is not None and job.state == DONE
+                and succeeded(job.casedir, job.returncode))
+
+    def mark(self, casedir, state, returncode=None, wall_time=None):
+        """Record the state of a case, counting an attempt unless running."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + ?, "
+                "returncode = ?, wall_time = ?, updated = ? "
+                "WHERE casedir = ?",
+                (state, int(state != RUNNING), returncode, wall_time,
+                 time.time(), os.path.abspath(casedir)))
+
+    def counts(self):
+        """Return the number of jobs in every state."""
+        return dict(self.connection.execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+async def run_job(casedir, script=vspscript.VSPSCRIPT, timeout=None,
+                  log_path=runlog.RUN_LOG, tags=None):
+    """Run ``vsp -script`` once inside `casedir`.
+
+    Return the return code, or None when the run was killed after
+    `timeout` s, and the wall time in s. The run is logged like those of
+    runner.run_case, without CPU times or peak RSS.
+    """
+    start = time.time()
+    process = await asyncio.create_subprocess_exec(
+        "vsp", "-script", script, cwd=casedir)
+    try:
+        returncode = await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        returncode = None
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    end = time.time()
+
+    if log_path is not None:
+        runlog.record(log_path, runlog.case_entry(
+            casedir, script, start, end, returncode, tags=tags))
+
+    return returncode, end - start
+
+
+async def run_jobs(job_queue, casedir_list, max_workers=None, timeout=None,
+                   retries=MAX_RETRIES, log_path=runlog.RUN_LOG, tags=None):
+    """Run the unfinished jobs among `casedir_list`, yielding a Progress.
+
+    At most `max_workers` solver processes, by default one per available
+    core, are alive at once. A job that crashes, times out or leaves no
+    polar is retried up to `retries` times before it is marked failed.
+    """
+    if max_workers is None:
+        max_workers = runner.available_cores()
+
+    job_list = [job_queue.job(casedir) for casedir in casedir_list
+                if not job_queue.finished(casedir)]
+    total = len(casedir_list)
+    done = total - len(job_list)
+    failed = 0
+
+    semaphore = asyncio.Semaphore(max_workers)
+    event_queue = asyncio.Queue()
+
+    async def supervise(job):
+        try:
+            for attempt in range(1, retries + 2):
+                async with semaphore:
+                    job_queue.mark(job.casedir, RUNNING)
+                    returncode, wall_time = await run_job(
+                        job.casedir, job.script, timeout, log_path, tags)
+
+                if succeeded(job.casedir, returncode):
+                    state = DONE
+                elif attempt > retries:
+                    state = FAILED
+                else:
+                    state = PENDING
+                job_queue.mark(job.casedir, state, returncode, wall_time)
+                event_queue.put_nowait(
+                    (job.casedir, state, attempt, returncode, wall_time))
+                if state != PENDING:
+                    return
+        except Exception as error:
+            event_queue.put_nowait(error)
+            raise
+
+    task_list = [asyncio.ensure_future(supervise(job)) for job in job_list]
+    try:
+        remaining = len(task_list)
+        while remaining:
+            event = await event_queue.get()
+            if isinstance(event, Exception):
+                raise event
+
+            state = event[1]
+            if state != PENDING:
+                remaining -= 1
+                done += state == DONE
+                failed += state == FAILED
+            yield Progress(*event, done, failed, total)
+    finally:
+        for task in task_list:
+            task.cancel()
+        await asyncio.gather(*task_list, return_exceptions=True)
+
+
+def print_progress(progress):
+    """Print one line per attempt."""
+    print("[{0}/{1} done, {2} failed] {3}: {4} after {5:.1f} s "
+          "(attempt {6}, return code {7})".format(
+              progress.done, progress.total, progress.failed,
+              os.path.basename(progress.casedir), progress.state,
+              progress.wall_time, progress.attempt, progress.returncode))
+
+
+def run_cases(casedir_list, queue_path, script=vspscript.VSPSCRIPT,
+              max_workers=None, timeout=None, retries=MAX_RETRIES,
+              log_path=runlog.RUN_LOG, tags=None, progress=None):
+    """Queue the cases in `queue_path` and run those not finished yet.
+
+    Every case directory must already hold its script. `progress` is
+    called with the Progress of every attempt unless it is None, e.g.
+    print_progress from a command-line script. Return
+    the wall times of the last attempt of every case in order, None for
+    cases never run.
+    """
+    job_queue = JobQueue(queue_path)
+    try:
+        job_queue.add(casedir_list, script)
+
+        async def consume():
+            async for event in run_jobs(job_queue, casedir_list, max_workers,
+                                        timeout, retries, log_path, tags):
+                if progress is not None:
+                    progress(event)
+
+        asyncio.run(consume())
+
+        return [job_queue.job(casedir).wall_time for casedir in casedir_list]
+    finally:
+        job_queue.close()
@@ -0,0 +1,53 @@
+"""Stream the cases of a VSPAERO .lod spanload file."""
+from collections import namedtuple
+
+import numpy as np
+
+from .polar import header_index
+
+LodCase = namedtuple("LodCase", ["reference", "columns", "stations"])
+LodCase.__doc__ = """Spanload of one solver case.
+
+`reference` maps the reference quantities (``"Sref"``, ``"Cref"``,
+``"Mach"``, ``"AoA"``, ...) to their values, `columns` maps the station
+column names (``"Wing"``, ``"S"``, ``"Chord"``, ``"Cl"``, ...) to their
+index and `stations` holds one row per span station of every wing.
+"""
+
+
+def iter_lod(path):
+    """Yield a LodCase for every case of a .lod file in a single pass."""
+    with open(path) as file_object:
+        reference = None
+        for line in file_object:
+            if line.startswith("# Name"):
+                reference = {}
+                for line in file_object:
+                    tokens = line.split()
+                    if not tokens:
+                        break
+                    reference[tokens[0].rstrip("_")] = float(tokens[1])
+
+            elif reference is not None and line.split()[:1] == ["Wing"]:
+                columns = header_index(line)
+                station_lines = []
+                for line in file_object:
+                    if not line.strip():
+                        break
+                    station_lines.append(line)
+
+                yield LodCase(reference, columns,
+                              np.loadtxt(station_lines, ndmin=2))
+                reference = None
+
+
+def read_lod(path):
+    """Return the list of every LodCase of a .lod file."""
+    return list(iter_lod(path))
+
+
+def wing_stations(lod_case, wing=1):
+    """Return the span-station rows of one wing surface of a case."""
+    wing_array = lod_case.stations[:, lod_case.columns["Wing"]]
+
+    return lod_case.stations[wing_array == wing]
@@ -0,0 +1,106 @@
+"""Vectorized error metrics between solver results and reference data.
+
+Every function works along the last axis, so a single case is a 1-D array
+and a batch of cases is a 2-D (case, point) array. Batches with different
+numbers of points per case are NaN-padded with stack(); padded points are
+ignored everywhere.
+"""
+import numpy as np
+
+
+def stack(array_list):
+    """Stack 1-D arrays of unequal length into a NaN-padded 2-D array."""
+    npts = max((len(values) for values in array_list), default=0)
+    stacked = np.full((len(array_list), npts), np.nan)
+    for i, values in enumerate(array_list):
+        stacked[i, :len(values)] = values
+
+    return stacked
+
+
+def slope(x, y):
+    """Return the least-squares slope of `y` against `x`."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    count = valid.sum(axis=-1)
+    x_mean = np.where(valid, x, 0).sum(axis=-1)/count
+    y_mean = np.where(valid, y, 0).sum(axis=-1)/count
+    dx = np.where(valid, x - x_mean[..., None], 0)
+    dy = np.where(valid, y - y_mean[..., None], 0)
+
+    return (dx*dy).sum(axis=-1)/(dx*dx).sum(axis=-1)
+
+
+def lift_slope(alpha, CL):
+    """Return the least-squares lift curve slope in 1/rad; `alpha` in deg."""
+    return slope(np.radians(alpha), CL)
+
+
+def moment_slope(CL, CM):
+    """Return the least-squares slope dCM/dCL."""
+    return slope(CL, CM)
+
+
+def interp(x_new, x, y):
+    """Interpolate linearly, extrapolating beyond the ends of `x`.
+
+    `x` need not be sorted; each case of a batch is interpolated onto its
+    own row of `x_new`.
+    """
+    x_new = np.asarray(x_new, dtype=float)
+    order = np.argsort(x, axis=-1)
+    x = np.take_along_axis(np.asarray(x, dtype=float), order, axis=-1)
+    y = np.take_along_axis(np.asarray(y, dtype=float), order, axis=-1)
+    batch_shape = np.broadcast_shapes(x.shape[:-1], x_new.shape[:-1])
+    x = np.broadcast_to(x, batch_shape + x.shape[-1:])
+    y = np.broadcast_to(y, batch_shape + y.shape[-1:])
+    x_new = np.broadcast_to(x_new, batch_shape + x_new.shape[-1:])
+
+    # Index of the segment each new point falls into, clipped so the end
+    # segments are extended
+    npts = (~np.isnan(x)).sum(axis=-1)[..., None]
+    index = (x[..., None, :] <= x_new[..., :, None]).sum(axis=-1)
+    index = np.clip(index, 1, npts - 1)
+
+    x0 = np.take_along_axis(x, index - 1, axis=-1)
+    x1 = np.take_along_axis(x, index, axis=-1)
+    y0 = np.take_along_axis(y, index - 1, axis=-1)
+    y1 = np.take_along_axis(y, index, axis=-1)
+
+    return y0 + (y1 - y0)*(x_new - x0)/(x1 - x0)
+
+
+def rms(values, reference):
+    """Return the root mean square difference, ignoring NaN points."""
+    return np.sqrt(np.nanmean((np.asarray(values) - reference)**2, axis=-1))
+
+
+def mape(values, reference):
+    """Return the mean absolute percent error, ignoring NaN points."""
+    return np.nanmean(
+        np.abs((np.asarray(values) - reference)/reference), axis=-1)*100
+
+
+def percent_error(value, reference):
+    """Return the absolute percent error of `value` against `reference`."""
+    return np.abs((np.asarray(value) - reference)/reference)*100
+
+
+def curve_error(x, y, x_ref, y_ref):
+    """Return the RMS and MAPE of a curve against reference points.
+
+    The curve is interpolated onto the reference abscissae; reference
+    points outside the curve are compared with its extrapolation.
+    """
+    y_at_ref = interp(x_ref, x, y)
+
+    return rms(y_at_ref, y_ref), mape(y_at_ref, y_ref)
+
+
+def spanload_error(y, cl, y_ref, cl_ref):
+    """Return the MAPE of a spanload against reference data.
+
+    The reference is interpolated onto the solver span stations `y`.
+    """
+    return mape(cl, interp(y, y_ref, cl_ref))
@@ -0,0 +1,31 @@
+"""Shared figure style of the validation studies.
+
+Matplotlib and seaborn are only imported by pyplot(), on first use, so
+that importing a study to plan, solve or parse its cases stays cheap.
+"""
+import functools
+
+DPI = 300
+PALETTE = ["darkblue", "darkorange", "darkgreen", "firebrick",
+           "purple", "mediumvioletred", "goldenrod", "darkcyan"]
+MARKERS = ["o", "^", "s", "P", "d"]
+LEGEND_FONTSIZE = "small"
+GRAPHICS_DIR = "graphics"
+
+
+def set_theme():
+    """Apply the seaborn theme used by every study figure."""
+    import seaborn as sns
+
+    sns.set_theme(style="whitegrid", font="Times New Roman",
+                  context="paper", palette=PALETTE)
+
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    """Return matplotlib.pyplot, applying the theme on the first call."""
+    import matplotlib.pyplot as plt
+
+    set_theme()
+
+    return plt
@@ -0,0 +1,35 @@
+"""Read VSPAERO .polar files into named columns."""
+import functools
+import os
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def header_index(header):
+    """Map every column name of a .polar header line to its index."""
+    return {name: i for i, name in enumerate(header.split())}
+
+
+@functools.lru_cache(maxsize=1024)
+def _read_polar(path, mtime_ns, size):
+    with open(path) as file_object:
+        index = header_index(file_object.readline())
+        polar_array = np.loadtxt(file_object, ndmin=2)
+    polar_array.setflags(write=False)
+
+    return {name: polar_array[:, i] for name, i in index.items()}
+
+
+def read_polar(path):
+    """Return the columns of a .polar file as a dict of read-only arrays.
+
+    Columns are keyed by their header name (``"CL"``, ``"CDi"``, ``"CMy"``,
+    ...), so lookups do not depend on the column order of the VSPAERO
+    version that wrote the file. Parsed files are memoized on their path,
+    modification time and size; a rewritten file is parsed again.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+
+    return _read_polar(path, stat.st_mtime_ns, stat.st_size)
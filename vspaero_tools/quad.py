@@ -0,0 +1,118 @@
+"""Bulk-load the VSPAERO quad-tree cutting plane files of a run.
+
+A run with quad trees writes ``<stem>.quad.cases``, which lists every tree
+with the axis and position of its cutting plane, and one
+``<stem>.case.<N>.quad.<M>.dat`` file per solver case and tree. Each of
+these holds a plane header, the node and cell counts, one row per node
+(index, x, y, z, u, v, w, Cp) and one row per cell (index and four node
+indices).
+"""
+import os
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import adb
+
+NODE_COLUMNS = {"x": 0, "y": 1, "z": 2, "u": 3, "v": 4, "w": 5, "Cp": 6}
+NODE_WIDTH = 8
+CELL_WIDTH = 5
+HEADER_SIZE = 6
+
+QuadTree = namedtuple("QuadTree", ["header", "nodes", "cells"])
+QuadTree.__doc__ = """One quad-tree file of one solver case.
+
+`header` holds the four values of its first line, `nodes` one row of
+NODE_COLUMNS per node and `cells` the zero-based node indices of every
+quad cell.
+"""
+
+QuadData = namedtuple("QuadData", ["planes", "nodes", "node_counts",
+                                   "cells", "cell_counts"])
+QuadData.__doc__ = """Every quad tree of every case of a run, stacked.
+
+`planes` has one ``(tree, axis, position)`` row per tree, as listed in
+the .quad.cases file. `nodes` is indexed by (case, tree, node, column of
+NODE_COLUMNS) and `cells` by (case, tree, cell, corner). Trees have
+different sizes, so the arrays are padded, `nodes` with NaN and `cells`
+with -1; `node_counts` and `cell_counts` give the actual sizes. A case
+without a file for a tree has counts of zero.
+"""
+
+
+def read_planes(path):
+    """Return the ``(tree, axis, position)`` rows of a .quad.cases file."""
+    with open(path) as file_object:
+        ntrees = int(file_object.readline())
+        plane_array = np.loadtxt(file_object, ndmin=2)
+
+    return plane_array[:ntrees]
+
+
+def read_quad(path):
+    """Parse one quad-tree .dat file into a QuadTree.
+
+    The whole file is tokenized in one call, as its layout follows from
+    the node and cell counts alone.
+    """
+    values = np.fromfile(path, sep=" ")
+    nnodes = int(values[4])
+    ncells = int(values[5])
+    node_end = HEADER_SIZE + nnodes*NODE_WIDTH
+    cell_end = node_end + ncells*CELL_WIDTH
+    if values.size != cell_end:
+        raise ValueError("{0} is not a complete quad-tree file".format(path))
+
+    nodes = values[HEADER_SIZE:node_end].reshape(nnodes, NODE_WIDTH)[:, 1:]
+    cells = values[node_end:cell_end].reshape(ncells, CELL_WIDTH)[:, 1:]
+
+    return QuadTree(values[:4], nodes, cells.astype(int) - 1)
+
+
+def quad_path(stem, case, tree):
+    """Return the path of the file of one case and tree."""
+    return "{0}.case.{1}.quad.{2}.dat".format(stem, case, tree)
+
+
+def _read_optional(path):
+    if os.path.isfile(path):
+        return read_quad(path)
+    return None
+
+
+def read_run(stem, max_workers=None):
+    """Load every quad-tree file of the run at `stem` into a QuadData.
+
+    `stem` is the path without suffix, e.g. ``.../wing_DegenGeom``. The
+    trees come from ``<stem>.quad.cases`` and the cases from
+    ``<stem>.adb.cases``. Files are parsed on a pool of `max_workers`
+    threads.
+    """
+    planes = read_planes(stem + ".quad.cases")
+    ncases = len(adb.read_cases(stem + ".adb.cases"))
+    tree_list = [int(tree) for tree in planes[:, 0]]
+    path_list = [quad_path(stem, case, tree)
+                 for case in range(1, ncases + 1) for tree in tree_list]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        quad_list = list(executor.map(_read_optional, path_list))
+
+    node_counts = np.array([0 if quad is None else len(quad.nodes)
+                            for quad in quad_list]).reshape(ncases, -1)
+    cell_counts = np.array([0 if quad is None else len(quad.cells)
+                            for quad in quad_list]).reshape(ncases, -1)
+    nodes = np.full((len(quad_list), node_counts.max(initial=0),
+                     len(NODE_COLUMNS)), np.nan)
+    cells = np.full((len(quad_list), cell_counts.max(initial=0), 4), -1)
+    for i, quad in enumerate(quad_list):
+        if quad is not None:
+            nodes[i, :len(quad.nodes)] = quad.nodes
+            cells[i, :len(quad.cells)] = quad.cells
+
+    return QuadData(planes,
+                    nodes.reshape(ncases, len(tree_list), *nodes.shape[1:]),
+                    node_counts,
+                    cells.reshape(ncases, len(tree_list), *cells.shape[1:]),
+                    cell_counts)
@@ -0,0 +1,116 @@
+"""Record per-case solver metrics to a JSON lines log and summarize them."""
+import datetime
+import glob
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from . import adb
+
+RUN_LOG = os.path.join("output", "runlog.jsonl")
+METRIC_FIELDS = ("wall_time", "cpu_user", "cpu_sys", "peak_rss",
+                 "bytes_written", "nodes", "tris", "loops")
+
+_lock = threading.Lock()
+
+
+def _peak_rss(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss
+    return rusage.ru_maxrss*1024
+
+
+def _bytes_written(casedir, since):
+    total = 0
+    for dirpath, _, fname_list in os.walk(casedir):
+        for fname in fname_list:
+            stat = os.stat(os.path.join(dirpath, fname))
+            if stat.st_mtime >= since:
+                total += stat.st_size
+
+    return total
+
+
+def _mesh_size(casedir):
+    adb_list = glob.glob(os.path.join(casedir, "*.adb"))
+    if not adb_list:
+        return {}
+
+    header = adb.read_header(max(adb_list, key=os.path.getmtime))
+    return {"nodes": int(header["nnodes"]), "tris": int(header["ntris"]),
+            "loops": int(header["nloops"])}
+
+
+def case_entry(casedir, script, start, end, returncode, rusage=None,
+               tags=None):
+    """Return the metrics of one finished solver run as a dict.
+
+    CPU times and peak RSS come from the resource usage of the ``vsp``
+    child and are None where the platform does not report it.
+    """
+    entry = {
+        "time": datetime.datetime.fromtimestamp(start).isoformat(),
+        "case": casedir,
+        "script": script,
+        "returncode": returncode,
+        "wall_time": end - start,
+        "cpu_user": rusage.ru_utime if rusage else None,
+        "cpu_sys": rusage.ru_stime if rusage else None,
+        "peak_rss": _peak_rss(rusage) if rusage else None,
+        "bytes_written": _bytes_written(casedir, start),
+    }
+    entry.update(_mesh_size(casedir))
+    entry.update(tags or {})
+
+    return entry
+
+
+def record(log_path, entry):
+    """Append one entry to a JSON lines log; safe across runner threads."""
+    line = json.dumps(entry) + "\n"
+    with _lock:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        with open(log_path, "a") as file_object:
+            file_object.write(line)
+
+
+def read_log(log_path, **match):
+    """Return the logged entries whose fields equal every `match` value."""
+    entry_list = []
+    with open(log_path) as file_object:
+        for line in file_object:
+            if line.strip():
+                entry = json.loads(line)
+                if all(entry.get(key) == value
+                       for key, value in match.items()):
+                    entry_list.append(entry)
+
+    return entry_list
+
+
+def summary(log_path, by="case", fields=METRIC_FIELDS, **match):
+    """Aggregate logged metrics per value of the `by` field.
+
+    Return a dict mapping each group to its number of runs and the mean and
+    maximum of every field in `fields` that was recorded.
+    """
+    group_dict = {}
+    for entry in read_log(log_path, **match):
+        group_dict.setdefault(entry.get(by), []).append(entry)
+
+    summary_dict = {}
+    for group, entry_list in group_dict.items():
+        stats = {"runs": len(entry_list)}
+        for name in fields:
+            values = np.array([entry[name] for entry in entry_list
+                               if entry.get(name) is not None], dtype=float)
+            if values.size:
+                stats[name + "_mean"] = float(np.mean(values))
+                stats[name + "_max"] = float(np.max(values))
+        summary_dict[group] = stats
+
+    return summary_dict
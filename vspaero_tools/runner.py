@@ -0,0 +1,80 @@
+"""Run VSPAERO cases in parallel, one scratch directory per case."""
+import os
+import shutil
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from . import runlog, vspscript
+
+CASES_DIR = "cases"
+
+
+def available_cores():
+    """Return the number of cores this process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def case_dir(outputdir, name, sweep_input=None):
+    """Create an empty scratch directory for a case and return its path.
+
+    When `sweep_input` is given, the VSPAERO script of the case is rendered
+    into the new directory so every case runs against its own files.
+    """
+    casedir = os.path.join(outputdir, CASES_DIR, name)
+    if os.path.isdir(casedir):
+        shutil.rmtree(casedir)
+    os.makedirs(casedir)
+
+    if sweep_input is not None:
+        vspscript.write(casedir, sweep_input)
+
+    return casedir
+
+
+def run_case(casedir, script=vspscript.VSPSCRIPT, log_path=runlog.RUN_LOG,
+             tags=None):
+    """Run ``vsp -script`` inside `casedir` and return the wall time in s.
+
+    Unless `log_path` is None, the metrics of the run (see
+    runlog.case_entry) are appended to it together with `tags`, e.g. the
+    OpenVSP version.
+    """
+    start = time.time()
+    process = subprocess.Popen(["vsp", "-script", script], cwd=casedir)
+    rusage = None
+    if hasattr(os, "wait4"):
+        # Reap the child ourselves to get its own resource usage
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    else:
+        process.wait()
+    end = time.time()
+
+    if log_path is not None:
+        runlog.record(log_path, runlog.case_entry(
+            casedir, script, start, end, process.returncode, rusage, tags))
+
+    return end - start
+
+
+def run_cases(casedir_list, script=vspscript.VSPSCRIPT, max_workers=None,
+              log_path=runlog.RUN_LOG, tags=None):
+    """Run all cases concurrently and return their wall times in order.
+
+    Each worker thread only supervises its own ``vsp`` child process, so
+    the pool size is the number of solver processes alive at once. It
+    defaults to the number of available cores.
+    """
+    if max_workers is None:
+        max_workers = available_cores()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        time_list = list(executor.map(
+            lambda casedir: run_case(casedir, script, log_path, tags),
+            casedir_list))
+
+    return time_list
@@ -0,0 +1,149 @@
+"""Stream the chordwise cuts of VSPAERO .slc slice files.
+
+VSPAERO writes one ``BLOCK Cut_<n>_at_<axis>:_<position>`` per cut and
+solver case, holding the x, y, z and dCp of the points along the cut.
+Every point is written twice, as the end of one segment and the start of
+the next. The ``.cuts`` file lists the axis and position of every cut.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import metrics
+
+POINT_COLUMNS = {"x": 0, "y": 1, "z": 2, "dCp": 3}
+CONDITION_NAMES = ("Mach", "Alpha", "Beta")
+
+SliceBlock = namedtuple("SliceBlock", ["cut", "case", "condition",
+                                       "points"])
+SliceBlock.__doc__ = """One cut of one solver case.
+
+`cut` and `case` are the one-based numbers VSPAERO gives them,
+`condition` maps CONDITION_NAMES to their values and `points` holds one
+row of POINT_COLUMNS per point, with the repeated rows removed.
+"""
+
+SliceData = namedtuple("SliceData", ["cuts", "conditions", "points",
+                                     "counts"])
+SliceData.__doc__ = """Every cut of every case of a .slc file, stacked.
+
+`cuts` lists the ``(axis, position)`` of every cut, `conditions` has one
+row of CONDITION_NAMES per case and `points` is indexed by (case, cut,
+point, column of POINT_COLUMNS). Cuts have different numbers of points,
+so `points` is NaN-padded and `counts` gives the actual numbers.
+"""
+
+
+def read_cuts(path):
+    """Return the ``(axis, position)`` of every cut of a .cuts file."""
+    with open(path) as file_object:
+        ncuts = int(file_object.readline())
+        cut_list = []
+        for line in file_object:
+            tokens = line.split()
+            if tokens:
+                cut_list.append((tokens[0], float(tokens[1])))
+
+    return cut_list[:ncuts]
+
+
+def dedupe(points):
+    """Drop every row that repeats the row before it."""
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+
+    return points[keep]
+
+
+def _condition(line):
+    tokens = line.split()
+    return {name: float(tokens[tokens.index(name + ":") + 1])
+            for name in CONDITION_NAMES}
+
+
+def iter_slc(path):
+    """Yield a SliceBlock for every block of a .slc file in a single pass."""
+    with open(path) as file_object:
+        block = None
+        point_lines = []
+        for line in file_object:
+            if line.startswith("BLOCK"):
+                if block is not None:
+                    yield block._replace(
+                        points=dedupe(np.loadtxt(point_lines, ndmin=2)))
+                cut = int(line.split()[1].split("_")[1])
+                case_line = next(file_object)
+                next(file_object)
+                block = SliceBlock(cut, int(case_line.split()[1]),
+                                   _condition(case_line), None)
+                point_lines = []
+            elif line.strip():
+                point_lines.append(line)
+
+        if block is not None:
+            yield block._replace(
+                points=dedupe(np.loadtxt(point_lines, ndmin=2)))
+
+
+def read_slc(path, cuts_path=None):
+    """Return the SliceData of a .slc file.
+
+    The cut positions are read from `cuts_path`, by default the .cuts file
+    next to `path`.
+    """
+    if cuts_path is None:
+        cuts_path = path[:-4] + ".cuts"
+
+    block_list = list(iter_slc(path))
+    ncases = max(block.case for block in block_list)
+    ncuts = max(block.cut for block in block_list)
+    npts = max(len(block.points) for block in block_list)
+
+    conditions = np.full((ncases, len(CONDITION_NAMES)), np.nan)
+    points = np.full((ncases, ncuts, npts, len(POINT_COLUMNS)), np.nan)
+    counts = np.zeros((ncases, ncuts), dtype=int)
+    for block in block_list:
+        conditions[block.case - 1] = [block.condition[name]
+                                      for name in CONDITION_NAMES]
+        points[block.case - 1, block.cut - 1, :len(block.points)] = (
+            block.points)
+        counts[block.case - 1, block.cut - 1] = len(block.points)
+
+    return SliceData(read_cuts(cuts_path), conditions, points, counts)
+
+
+def trace_index(slice_data):
+    """Return the number of the trace every point belongs to.
+
+    A cut through several surfaces, such as both halves of a wing at the
+    plane of symmetry, holds one trace per surface, each running from the
+    trailing to the leading edge; a new trace starts where x increases.
+    """
+    x = slice_data.points[..., POINT_COLUMNS["x"]]
+    index = np.zeros(x.shape, dtype=int)
+    index[..., 1:] = np.cumsum(np.diff(x, axis=-1) > 0, axis=-1)
+
+    return index
+
+
+def chord_fraction(slice_data):
+    """Return the x/c of every point, from the x extent of its cut."""
+    x = slice_data.points[..., POINT_COLUMNS["x"]]
+    x_le = np.nanmin(x, axis=-1, keepdims=True)
+    x_te = np.nanmax(x, axis=-1, keepdims=True)
+
+    return (x - x_le)/(x_te - x_le)
+
+
+def chordwise(slice_data, xc, column="dCp", trace=0):
+    """Interpolate `column` of every cut of every case onto the `xc` grid.
+
+    Only the points of one `trace` of each cut are used (see trace_index).
+    Return an array indexed by (case, cut, grid point).
+    """
+    on_trace = trace_index(slice_data) == trace
+
+    return metrics.interp(
+        xc, np.where(on_trace, chord_fraction(slice_data), np.nan),
+        np.where(on_trace, slice_data.points[..., POINT_COLUMNS[column]],
+                 np.nan))
@@ -0,0 +1,503 @@
+"""Describe validation studies as data and plan, run and report them."""
+import glob
+import hashlib
+import inspect
+import json
+import os
+
+from dataclasses import dataclass, field, replace
+
+from . import (archive, batch, cache, figures, geometry, history, jobqueue,
+               runner)
+
+OUTPUT_DIR = "output"
+CASE_STAMP = ".fingerprint"
+REPORT_STAMP = "report.json"
+FIGURE_STAMP = "figures.json"
+WAKE_FILE = "wake.json"
+STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "plotting.py")
+
+
+@dataclass(frozen=True)
+class Mesh:
+    """Tessellation and clustering of a wing; None keeps the default."""
+
+    chordwise_tess: int = 33
+    spanwise_tess: int = 24
+    root_clstr: float = 1
+    tip_clstr: float = 0.5
+    le_clstr: float = 0.25
+    te_clstr: float = 0.25
+
+    def parms(self):
+        """Return the ``(parm, group, value)`` triples of the mesh."""
+        parm_list = [("Tess_W", "Shape", self.chordwise_tess),
+                     ("SectTess_U", "XSec_1", self.spanwise_tess),
+                     ("InCluster", "XSec_1", self.root_clstr),
+                     ("OutCluster", "XSec_1", self.tip_clstr),
+                     ("LECluster", "WingGeom", self.le_clstr),
+                     ("TECluster", "WingGeom", self.te_clstr)]
+
+        return tuple(parm for parm in parm_list if parm[2] is not None)
+
+
+@dataclass(frozen=True)
+class Wing:
+    """Geometry of a single OpenVSP wing.
+
+    `parms` are applied first, as ``(parm, group, value)`` triples. When
+    `xsec_shape` names an OpenVSP ``XS_*`` constant, both sections are
+    changed to it and `xsec_parms` are applied afterwards. `driver_group`
+    names the three ``*_WSECT_DRIVER`` constants of the outer section.
+    """
+
+    parms: tuple = ()
+    xsec_shape: str = None
+    xsec_parms: tuple = ()
+    driver_group: tuple = None
+
+
+@dataclass(frozen=True)
+class Case:
+    """One VSPAERO run of a study."""
+
+    name: str
+    wing: Wing
+    sweep_input: object
+    mesh: Mesh = Mesh()
+
+    def parms(self):
+        """Return every input that defines the geometry, for hashing."""
+        parm_list = list(self.wing.parms)
+        if self.wing.driver_group is not None:
+            parm_list.append(("DriverGroup", "XSec_1",
+                              " ".join(self.wing.driver_group)))
+        if self.wing.xsec_shape is not None:
+            parm_list.append(("XSecShape", "XSecSurf_0", self.wing.xsec_shape))
+
+        return tuple(parm_list) + self.wing.xsec_parms + self.mesh.parms()
+
+
+@dataclass(frozen=True)
+class Figure:
+    """A figure of a study, drawn from the results of its cases.
+
+    `plot` is called as ``plot(study, results, *args)``, where `results`
+    maps every case name to its arrays as returned by
+    archive.case_arrays, and returns a Matplotlib figure. It is saved as a
+    PDF at `name`, relative to the study directory.
+    """
+
+    name: str
+    plot: object
+    args: tuple = ()
+
+
+@dataclass
+class Study:
+    """A validation study: its cases, reference data and report.
+
+    `studydir` holds the ``output``, ``graphics`` and ``data`` directories
+    of the study. `report` is called as ``report(study, casedir_dict)``
+    with the result directory of every case and returns a dict of metrics.
+    `inputs` lists the files inside `studydir` that the report reads, such
+    as reference data; together with the script defining `report` they
+    decide whether the report is stale. `figures` lists the Figure objects
+    rendered after the report.
+    """
+
+    name: str
+    studydir: str
+    cases: list
+    reference: dict = field(default_factory=dict)
+    report: object = None
+    inputs: tuple = ()
+    figures: tuple = ()
+
+    def path(self, *parts):
+        """Return a path inside the study directory."""
+        return os.path.join(self.studydir, *parts)
+
+
+def solver_version():
+    """Return the OpenVSP version the cases are solved with."""
+    import openvsp as vsp
+
+    return vsp.GetVSPVersion()
+
+
+def wake_settings(study):
+    """Return the wake settings recorded for `study`, or an empty dict."""
+    try:
+        with open(study.path(OUTPUT_DIR, WAKE_FILE)) as file_object:
+            return json.load(file_object)
+    except FileNotFoundError:
+        return {}
+
+
+def tune_wake(case, setting_dict):
+    """Return `case` with the recorded wake settings it leaves unset."""
+    change_dict = {name: value for name, value in setting_dict.items()
+                   if value is not None
+                   and getattr(case.sweep_input, name) is None}
+    if not change_dict:
+        return case
+
+    return replace(case, sweep_input=replace(case.sweep_input,
+                                             **change_dict))
+
+
+def record_wake(study, casedir_dict, version,
+                archive_dir=archive.ARCHIVE_DIR):
+    """Record the wake settings the cases of `study` need; return them.
+
+    The cases of a study are one family of wings, which serves as the
+    geometry class of history.recommend_wake_iters, applied to the cases
+    that leave ``wake_iters`` to the default and were last solved with it
+    under `version`. Histories cut at a recorded count never look settled,
+    so without such cases the recorded count is kept; when some case has
+    not settled, no count is recorded and the default applies again.
+    ``wake_nodes`` is recommended by history.recommend_wake_nodes once the
+    archive holds the same cases solved with several wake node counts.
+    """
+    history_case_list = []
+    for case in study.cases:
+        casedir = casedir_dict[case.name]
+        path = os.path.join(casedir,
+                            case.sweep_input.fname[:-5] + "_DegenGeom.history")
+        if (case.sweep_input.wake_iters is None and os.path.isfile(path)
+                and case_stamp(casedir) == cache.key(
+                    case.parms(), case.sweep_input, version)):
+            history_case_list.extend(history.read_history(path))
+
+    setting_dict = {"wake_iters": wake_settings(study).get("wake_iters"),
+                    "wake_nodes": None}
+    if history_case_list:
+        setting_dict["wake_iters"] = history.recommend_wake_iters(
+            history_case_list)
+
+    node_dict = {}
+    if archive_dir is not None:
+        for entry in archive.read_index(archive_dir, study=study.name):
+            wake_nodes = entry.get("wake_nodes")
+            if wake_nodes is None:
+                wake_nodes = history.DEFAULT_WAKE_NODES
+            # The latest run of every case with every wake node count
+            node_dict.setdefault(wake_nodes, {})[entry["case"]] = entry
+    if len(node_dict) > 1:
+        name_list = sorted(set.intersection(
+            *(set(entry_dict) for entry_dict in node_dict.values())))
+        result_dict = {}
+        for wake_nodes, entry_dict in node_dict.items():
+            result_dict[wake_nodes] = []
+            for name in name_list:
+                with archive.load(entry_dict[name], archive_dir) as npz:
+                    result_dict[wake_nodes].extend(history.from_columns(
+                        {key[len("history/"):]: npz[key] for key in npz.files
+                         if key.startswith("history/")}))
+        if name_list:
+            setting_dict["wake_nodes"] = history.recommend_wake_nodes(
+                result_dict)
+
+    path = study.path(OUTPUT_DIR, WAKE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file_object:
+        json.dump(setting_dict, file_object, indent=2)
+
+    return setting_dict
+
+
+def _case_dir(study, case):
+    return study.path(OUTPUT_DIR, runner.CASES_DIR, case.name)
+
+
+def plan(study_list, version):
+    """Deduplicate the cases of all studies.
+
+    The wake settings recorded for a study fill in those its cases leave
+    to the defaults, except for cases already solved with the defaults.
+    Every case is solved in the directory of the first study requesting
+    it, which is where it is checked. Return a dict mapping the cache key
+    of every distinct case to the case and the list of ``(study, case)``
+    pairs that request it.
+    """
+    plan_dict = {}
+    for study in study_list:
+        setting_dict = wake_settings(study)
+        for case in study.cases:
+            case_key = cache.key(case.parms(), case.sweep_input, version)
+            tuned_case = tune_wake(case, setting_dict)
+            casedir = _case_dir(study, case)
+            if case_key in plan_dict:
+                first_case, request_list = plan_dict[case_key]
+                casedir = _case_dir(request_list[0][0], first_case)
+            if tuned_case is not case and case_stamp(casedir) != case_key:
+                case = tuned_case
+                case_key = cache.key(case.parms(), case.sweep_input, version)
+            plan_dict.setdefault(case_key, (case, []))[1].append(
+                (study, case))
+
+    return plan_dict
+
+
+def file_digest(path):
+    """Return the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        for chunk in iter(lambda: file_object.read(1 << 16), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def case_stamp(casedir):
+    """Return the cache key the results in `casedir` were solved for."""
+    try:
+        with open(os.path.join(casedir, CASE_STAMP)) as file_object:
+            return file_object.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _write_case_stamp(casedir, case_key):
+    # Only stamp directories the solver actually produced results in
+    if glob.glob(os.path.join(casedir, "*.polar")):
+        with open(os.path.join(casedir, CASE_STAMP), "w") as file_object:
+            file_object.write(case_key)
+
+
+def report_fingerprint(study, casedir_dict):
+    """Return the fingerprint of everything the report of `study` reads.
+
+    It combines the stamps of the case results with the contents of the
+    study `inputs` and of the script that defines the report.
+    """
+    input_list = [study.path(path) for path in study.inputs]
+    if study.report is not None:
+        input_list.append(inspect.getsourcefile(study.report))
+
+    payload = json.dumps({
+        "cases": {name: case_stamp(casedir)
+                  for name, casedir in casedir_dict.items()},
+        "inputs": {os.path.relpath(path, study.studydir): file_digest(path)
+                   for path in input_list},
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run(study_list, max_workers=None, use_cache=True, force=False,
+        archive_dir=archive.ARCHIVE_DIR, use_queue=False, timeout=None,
+        progress=None):
+    """Solve every distinct case of the studies in one scheduling pass.
+
+    Cases whose directory is stamped with their current cache key are up
+    to date and left alone unless `force` is set. Cached cases are
+    restored; the others are built, merged into as few VSPAERO sweeps as
+    possible and run across the available cores. Newly solved cases are
+    archived for every study requesting them unless `archive_dir` is None.
+    With `use_queue`, the sweeps run as supervised ``vsp`` processes from
+    a job queue in the output directory of the first study, each killed
+    after `timeout` s, and an interrupted run resumes without re-solving
+    the sweeps it finished; `progress` is then called with every attempt
+    (see jobqueue.run_cases). Return a dict mapping each study name to
+    its ``{case name: casedir}``.
+
+    Cases left without results by a failed sweep are not stamped, cached
+    or archived, so the next run solves them again. Once the other cases
+    are done, RuntimeError is raised naming them.
+    """
+    version = solver_version()
+    plan_dict = plan(study_list, version)
+
+    # One live model serves every case that has to be solved
+    session = None
+    pending_list = []
+    result_dict = {study.name: {} for study in study_list}
+    for case_key, (case, request_list) in plan_dict.items():
+        first_study = request_list[0][0]
+        casedir = _case_dir(first_study, case)
+        for study, requested_case in request_list:
+            result_dict[study.name][requested_case.name] = casedir
+
+        if not force and case_stamp(casedir) == case_key:
+            continue
+
+        if use_cache and cache.restore(case_key, casedir):
+            _write_case_stamp(casedir, case_key)
+            continue
+
+        if session is None:
+            session = geometry.Session()
+        session.apply(case)
+        casedir = runner.case_dir(first_study.path(OUTPUT_DIR), case.name,
+                                  case.sweep_input)
+        session.write(os.path.join(casedir, case.sweep_input.fname))
+        pending_list.append((case_key, case, casedir))
+
+    failed_list = []
+    if pending_list:
+        batch_run = batch.run_cases(
+            [casedir for _, _, casedir in pending_list],
+            [case.sweep_input for _, case, _ in pending_list],
+            [case.parms() for _, case, _ in pending_list],
+            study_list[0].path(OUTPUT_DIR), max_workers=max_workers,
+            queue_path=(study_list[0].path(OUTPUT_DIR, jobqueue.QUEUE_FILE)
+                        if use_queue else None),
+            timeout=timeout, progress=progress)
+
+        # Cases of failed sweeps stay unstamped and are solved next time
+        failed_list = [
+            "{0}/{1}".format(study.name, requested_case.name)
+            for case_key, _, casedir in pending_list
+            if casedir in batch_run.failed
+            for study, requested_case in plan_dict[case_key][1]]
+        pending_list = [(case_key, case, casedir)
+                        for case_key, case, casedir in pending_list
+                        if casedir not in batch_run.failed]
+        for case_key, _, casedir in pending_list:
+            _write_case_stamp(casedir, case_key)
+            if use_cache:
+                cache.store(case_key, casedir)
+            if archive_dir is not None:
+                for study, requested_case in plan_dict[case_key][1]:
+                    archive.store(study.name, requested_case, casedir,
+                                  case_key, archive_dir=archive_dir)
+
+        # Studies with new histories may need other wake settings
+        solved_set = {study.name for case_key, _, _ in pending_list
+                      for study, _ in plan_dict[case_key][1]}
+        for study in study_list:
+            if study.name in solved_set:
+                record_wake(study, result_dict[study.name], version,
+                            archive_dir)
+
+    if failed_list:
+        raise RuntimeError("no results for {0}".format(
+            ", ".join(failed_list)))
+
+    return result_dict
+
+
+def report(study_list, result_dict, force=False):
+    """Report every study and return its metrics keyed by study name.
+
+    A study whose report fingerprint matches the one recorded by its last
+    report is skipped and its recorded metrics are returned instead.
+    """
+    metric_dict = {}
+    for study in study_list:
+        if study.report is None:
+            continue
+
+        casedir_dict = result_dict[study.name]
+        stamp_path = study.path(OUTPUT_DIR, REPORT_STAMP)
+        fingerprint = report_fingerprint(study, casedir_dict)
+        if not force and os.path.isfile(stamp_path):
+            with open(stamp_path) as file_object:
+                stamp = json.load(file_object)
+            if stamp["fingerprint"] == fingerprint:
+                metric_dict[study.name] = stamp["metrics"]
+                continue
+
+        metrics = study.report(study, casedir_dict)
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        with open(stamp_path, "w") as file_object:
+            json.dump({"fingerprint": fingerprint, "metrics": metrics},
+                      file_object, indent=2, default=float)
+        metric_dict[study.name] = metrics
+
+    return metric_dict
+
+
+def figure_fingerprint(study, figure, casedir_dict):
+    """Return the fingerprint of everything a figure of `study` is drawn from.
+
+    It extends the report fingerprint with the script defining the figure,
+    its arguments and the shared figure style.
+    """
+    payload = json.dumps({
+        "report": report_fingerprint(study, casedir_dict),
+        "figure": [figure.name, repr(figure.args)],
+        "plot": file_digest(inspect.getsourcefile(figure.plot)),
+        "style": file_digest(STYLE_PATH),
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render(study_list, result_dict, max_workers=None, force=False,
+           archive_dir=archive.ARCHIVE_DIR):
+    """Render the figures of the studies and return the saved paths.
+
+    Each case is drawn from its archived results when the archive holds
+    the ones in its directory, and from the directory otherwise. Figures
+    whose fingerprint matches the one recorded at their last rendering
+    are skipped; the others are rendered in worker processes.
+    """
+    task_list = []
+    stamp_list = []
+    for study in study_list:
+        if not study.figures:
+            continue
+
+        casedir_dict = result_dict[study.name]
+        entry_dict = {}
+        if archive_dir is not None:
+            for entry in archive.read_index(archive_dir, study=study.name):
+                entry_dict[entry["case"], entry["key"]] = entry
+
+        source_dict = {}
+        for case in study.cases:
+            casedir = casedir_dict[case.name]
+            entry = entry_dict.get((case.name, case_stamp(casedir)))
+            npz_path = (None if entry is None
+                        else os.path.join(archive_dir, entry["file"]))
+            source_dict[case.name] = (npz_path, casedir,
+                                      case.sweep_input.fname)
+
+        stamp_path = study.path(OUTPUT_DIR, FIGURE_STAMP)
+        stamp = {}
+        if os.path.isfile(stamp_path):
+            with open(stamp_path) as file_object:
+                stamp = json.load(file_object)
+
+        for figure in study.figures:
+            fingerprint = figure_fingerprint(study, figure, casedir_dict)
+            path = study.path(figure.name)
+            if (not force and stamp.get(figure.name) == fingerprint
+                    and os.path.isfile(path)):
+                continue
+
+            stamp[figure.name] = fingerprint
+            task_list.append((inspect.getsourcefile(figure.plot),
+                              figure.name, source_dict, path))
+        stamp_list.append((stamp_path, stamp))
+
+    path_list = figures.render_all(task_list, max_workers)
+
+    # Only recorded once every figure was saved
+    for stamp_path, stamp in stamp_list:
+        os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+        with open(stamp_path, "w") as file_object:
+            json.dump(stamp, file_object, indent=2)
+
+    return path_list
+
+
+def run_suite(study_list, max_workers=None, use_cache=True, force=False,
+              use_queue=False, timeout=None, progress=None):
+    """Plan, run, report and render a list of studies; return their metrics.
+
+    Only the cases, reports and figures whose inputs changed since the
+    last run are redone, unless `force` is set. Nothing is reported when
+    some case could not be solved (see run).
+    """
+    result_dict = run(study_list, max_workers, use_cache, force,
+                      use_queue=use_queue, timeout=timeout,
+                      progress=progress)
+    metric_dict = report(study_list, result_dict, force)
+    render(study_list, result_dict, max_workers, force)
+
+    return metric_dict
@@ -0,0 +1,396 @@
+"""Gaussian-process surrogate of the polar coefficients of a wing.
+
+Every archived angle of attack is one training point, described by the
+FEATURES of the wing planform and of the flow. Cases only train the same
+processes when they agree on every other input, such as the moment
+reference point, the airfoil and the mesh (see partition_key). Each
+coefficient has its own Gaussian process, whose kernel hyperparameters
+maximize the marginal likelihood. screen() predicts cases from the
+surrogate and only solves those whose predicted uncertainty exceeds a
+tolerance, or which no partition matches.
+"""
+import dataclasses
+import json
+import os
+
+import numpy as np
+
+from . import archive, batch, polar, study, vspscript
+
+FEATURES = ("AR", "taper", "sweep", "twist", "dihedral", "mach", "alpha")
+# Inputs planform() reads, the sweep ranges the mach and alpha FEATURES
+# cover, and the fields that only name a run or its archive file
+FEATURE_INPUTS = (
+    "XSec_1.Aspect", "XSec_1.Taper", "XSec_1.Span", "XSec_1.Root_Chord",
+    "XSec_1.Tip_Chord", "XSec_1.Sweep", "XSec_1.Twist", "XSec_1.Dihedral",
+    "WingGeom.TotalSpan", "alpha_i", "alpha_f", "alpha_npts", "mach",
+    "mach_f", "mach_npts")
+RUN_FIELDS = ("fname", "time", "study", "case", "key", "file")
+COEFFICIENTS = ("CL", "CDi", "CMy")
+SCREEN_STUDY = "surrogate"
+NOISE = 1e-6
+LOG_LENGTH_BOUNDS = (-4.0, 4.0)
+
+
+def planform(input_dict):
+    """Return the planform FEATURES of a wing as a dict.
+
+    `input_dict` holds the wing inputs keyed like archive.case_inputs. The
+    outer section is either driven by its aspect ratio and taper, or sized
+    by its span (or the total span) and its root and tip chords.
+    """
+    def section(parm, default=None):
+        return input_dict.get("XSec_1." + parm, default)
+
+    root_chord = section("Root_Chord")
+    tip_chord = section("Tip_Chord")
+    if section("Aspect") is not None:
+        # The section aspect ratio is that of one half of the wing
+        aspect = 2*section("Aspect")
+        taper = section("Taper", 1.0)
+    elif root_chord is not None and tip_chord is not None:
+        if section("Span") is not None:
+            span = 2*section("Span")
+        else:
+            span = input_dict["WingGeom.TotalSpan"]
+        aspect = 2*span/(root_chord + tip_chord)
+        taper = tip_chord/root_chord
+    else:
+        raise ValueError("Cannot tell the planform from {0}".format(
+            sorted(input_dict)))
+
+    return {"AR": aspect, "taper": taper, "sweep": section("Sweep", 0.0),
+            "twist": section("Twist", 0.0),
+            "dihedral": section("Dihedral", 0.0)}
+
+
+def feature_rows(input_dict, mach, alpha):
+    """Return the FEATURES rows of a wing at the given Mach and alpha."""
+    planform_dict = planform(input_dict)
+    mach, alpha = np.broadcast_arrays(np.asarray(mach, dtype=float),
+                                      np.asarray(alpha, dtype=float))
+    column_dict = {"mach": mach.ravel(), "alpha": alpha.ravel()}
+    for name, value in planform_dict.items():
+        column_dict[name] = np.full(mach.size, float(value))
+
+    return np.column_stack([column_dict[name] for name in FEATURES])
+
+
+def partition_key(input_dict):
+    """Return the inputs of a wing outside FEATURES as a match key.
+
+    `input_dict` is keyed like archive.case_inputs, or is an index entry.
+    Only cases with equal keys, e.g. the same x_cg, z_cg, cref, airfoil
+    and tessellation, share a surrogate.
+    """
+    return json.dumps({name: value for name, value in input_dict.items()
+                       if name not in FEATURE_INPUTS + RUN_FIELDS},
+                      sort_keys=True)
+
+
+def _snap(values, grid):
+    values = np.asarray(values, dtype=float)
+    return grid[np.abs(values[:, None] - grid[None, :]).argmin(axis=1)]
+
+
+def entry_features(entry, mach, alpha):
+    """Return the FEATURES rows of the polar of an archived case.
+
+    The polar Mach numbers and angles of attack are snapped onto the grid
+    of the sweep in `entry`, as in batch.split (VSPAERO reports a zero
+    Mach number as 0.001), so that they match those of case_features.
+    """
+    sweep_input = vspscript.SweepInput(
+        **{field.name: entry[field.name]
+           for field in dataclasses.fields(vspscript.SweepInput)})
+
+    return feature_rows(entry, _snap(mach, batch.sweep_machs(sweep_input)),
+                        _snap(alpha, batch.sweep_alphas(sweep_input)))
+
+
+def case_features(case):
+    """Return the FEATURES rows of every point of the sweep of a case."""
+    machs = batch.sweep_machs(case.sweep_input)
+    alphas = batch.sweep_alphas(case.sweep_input)
+    mach, alpha = np.meshgrid(machs, alphas, indexing="ij")
+
+    return feature_rows(archive.case_inputs(case), mach, alpha)
+
+
+def _standardize(values):
+    mean = values.mean(axis=0)
+    scale = values.std(axis=0)
+
+    return mean, np.where(scale > 0, scale, 1.0)
+
+
+class GaussianProcess:
+    """Gaussian-process regression of one output.
+
+    The kernel is a squared exponential with one length scale per input,
+    on standardized inputs and output. A small `noise` variance keeps the
+    kernel matrix well conditioned for the deterministic solver.
+    """
+
+    def __init__(self, noise=NOISE):
+        self.noise = noise
+        self.log_lengths = None
+        self.log_variance = 0.0
+
+    def _kernel(self, a, b, log_lengths, log_variance):
+        a = a/np.exp(log_lengths)
+        b = b/np.exp(log_lengths)
+        sq_dist = ((a*a).sum(axis=1)[:, None] + (b*b).sum(axis=1)[None, :]
+                   - 2*a @ b.T)
+
+        return np.exp(log_variance - 0.5*np.maximum(sq_dist, 0))
+
+    def _factor(self, log_lengths, log_variance):
+        kernel = self._kernel(self.x, self.x, log_lengths, log_variance)
+        kernel[np.diag_indices_from(kernel)] += self.noise
+
+        return np.linalg.cholesky(kernel)
+
+    def _neg_log_likelihood(self, theta):
+        try:
+            chol = self._factor(theta[:-1], theta[-1])
+        except np.linalg.LinAlgError:
+            return np.inf
+        z = np.linalg.solve(chol, self.y)
+
+        return 0.5*z @ z + np.log(np.diag(chol)).sum()
+
+    def fit(self, x, y, optimize=True):
+        """Condition the process on the points `x` and outputs `y`.
+
+        With `optimize`, the length scales and the signal variance are
+        first chosen to maximize the marginal likelihood, starting from
+        the previous ones.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.x_mean, self.x_scale = _standardize(x)
+        self.y_mean, self.y_scale = _standardize(y)
+        self.x = (x - self.x_mean)/self.x_scale
+        self.y = (y - self.y_mean)/self.y_scale
+
+        if self.log_lengths is None:
+            self.log_lengths = np.zeros(x.shape[1])
+        if optimize and len(y) > 1:
+            from scipy.optimize import minimize
+
+            result = minimize(
+                self._neg_log_likelihood,
+                np.append(self.log_lengths, self.log_variance),
+                method="L-BFGS-B",
+                bounds=[LOG_LENGTH_BOUNDS]*x.shape[1] + [(-6.0, 6.0)])
+            self.log_lengths = result.x[:-1]
+            self.log_variance = result.x[-1]
+
+        self.chol = self._factor(self.log_lengths, self.log_variance)
+        self.alpha = np.linalg.solve(
+            self.chol.T, np.linalg.solve(self.chol, self.y))
+
+        return self
+
+    def extend(self, x, y):
+        """Condition the fitted process on the further points `x`, `y`.
+
+        The hyperparameters and the standardization of the last fit are
+        kept, so the Cholesky factor only grows by the rows of the new
+        points, in O(n^2) rather than the O(n^3) of a refit.
+        """
+        from scipy.linalg import solve_triangular
+
+        x = (np.asarray(x, dtype=float) - self.x_mean)/self.x_scale
+        y = (np.asarray(y, dtype=float) - self.y_mean)/self.y_scale
+        cross = solve_triangular(self.chol, self._kernel(
+            self.x, x, self.log_lengths, self.log_variance), lower=True).T
+        corner = self._kernel(x, x, self.log_lengths, self.log_variance)
+        corner[np.diag_indices_from(corner)] += self.noise
+
+        size = len(self.x)
+        chol = np.zeros((size + len(x),)*2)
+        chol[:size, :size] = self.chol
+        chol[size:, :size] = cross
+        chol[size:, size:] = np.linalg.cholesky(corner - cross @ cross.T)
+        self.chol = chol
+        self.x = np.vstack([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.alpha = solve_triangular(
+            chol.T, solve_triangular(chol, self.y, lower=True), lower=False)
+
+        return self
+
+    def predict(self, x):
+        """Return the predicted mean and standard deviation at `x`."""
+        x = (np.asarray(x, dtype=float) - self.x_mean)/self.x_scale
+        kernel = self._kernel(x, self.x, self.log_lengths, self.log_variance)
+        v = np.linalg.solve(self.chol, kernel.T)
+        variance = np.exp(self.log_variance) - (v*v).sum(axis=0)
+
+        return (self.y_mean + self.y_scale*(kernel @ self.alpha),
+                self.y_scale*np.sqrt(np.maximum(variance, 0)))
+
+
+class Partition:
+    """Gaussian processes of COEFFICIENTS over the points of one key."""
+
+    def __init__(self, coefficients=COEFFICIENTS, noise=NOISE):
+        self.coefficients = coefficients
+        self.x = np.empty((0, len(FEATURES)))
+        self.y = {name: np.empty(0) for name in coefficients}
+        self.models = {name: GaussianProcess(noise) for name in coefficients}
+        self.fitted = 0
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y_dict):
+        """Add training points without retraining."""
+        self.x = np.vstack([self.x, x])
+        for name in self.coefficients:
+            self.y[name] = np.concatenate([self.y[name], y_dict[name]])
+
+    def train(self, optimize=True):
+        """Fit every coefficient to the training points.
+
+        With `optimize` or before the first fit, every process is refit
+        from scratch; otherwise it is extended with the points added since
+        it was last trained.
+        """
+        for name, model in self.models.items():
+            if optimize or not self.fitted:
+                model.fit(self.x, self.y[name], optimize)
+            else:
+                model.extend(self.x[self.fitted:],
+                             self.y[name][self.fitted:])
+        self.fitted = len(self.x)
+
+    def predict(self, x):
+        """Return the ``(mean, std)`` of every coefficient at `x`."""
+        return {name: model.predict(x) for name, model in self.models.items()}
+
+
+class Surrogate:
+    """Partitions of the archived results, keyed by partition_key.
+
+    update() adds the cases archived since the last call, each distinct
+    solve once, and retrains the partitions they fall in.
+    """
+
+    def __init__(self, coefficients=COEFFICIENTS, noise=NOISE):
+        self.coefficients = coefficients
+        self.noise = noise
+        self.keys = set()
+        self.partitions = {}
+
+    def __len__(self):
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def partition(self, input_dict):
+        """Return the Partition matching the inputs of a wing, or None."""
+        return self.partitions.get(partition_key(input_dict))
+
+    def update(self, archive_dir=archive.ARCHIVE_DIR, optimize=True,
+               **match):
+        """Train on the archived cases not seen yet; return their number.
+
+        `match` selects index entries as in archive.read_index, e.g. to
+        keep to one study. Entries whose planform cannot be told are
+        skipped. With `optimize`, the partitions holding new cases are
+        refit with new hyperparameters; otherwise they are extended
+        incrementally (see Partition.train).
+        """
+        count = 0
+        updated = set()
+        for entry in archive.read_index(archive_dir, **match):
+            if entry["key"] in self.keys:
+                continue
+            try:
+                planform(entry)
+            except ValueError:
+                continue
+
+            with archive.load(entry, archive_dir) as npz:
+                x = entry_features(entry, npz["polar/Mach"],
+                                   npz["polar/AoA"])
+                y_dict = {name: npz["polar/" + name]
+                          for name in self.coefficients}
+            key = partition_key(entry)
+            if key not in self.partitions:
+                self.partitions[key] = Partition(self.coefficients,
+                                                 self.noise)
+            self.partitions[key].add(x, y_dict)
+            updated.add(key)
+            self.keys.add(entry["key"])
+            count += 1
+
+        for key in updated:
+            self.partitions[key].train(optimize)
+
+        return count
+
+
+def solve_cases(case_list, studydir, archive_dir=archive.ARCHIVE_DIR):
+    """Solve cases through study.run and return their polars in order.
+
+    The cases form one study named SCREEN_STUDY in `studydir`, so their
+    results are cached and archived like those of any study. Raise
+    RuntimeError when some case could not be solved, as study.run does.
+    """
+    screen_study = study.Study(SCREEN_STUDY, studydir, case_list)
+    casedir_dict = study.run([screen_study],
+                             archive_dir=archive_dir)[SCREEN_STUDY]
+
+    return [polar.read_polar(os.path.join(
+        casedir_dict[case.name], case.sweep_input.fname[:-5]
+        + "_DegenGeom.polar")) for case in case_list]
+
+
+def screen(surrogate, case_list, tolerance, studydir,
+           archive_dir=archive.ARCHIVE_DIR):
+    """Predict the coefficients of every case, solving the uncertain ones.
+
+    A case is solved with solve_cases when no partition of the surrogate
+    matches its inputs, or when the predicted standard deviation of any
+    coefficient exceeds `tolerance` at any of its points; the surrogate is
+    then extended with the solved cases, keeping its hyperparameters.
+    Return one dict per case holding ``"Mach"``, ``"AoA"``, every
+    coefficient, its ``"<name>_std"`` (zero when solved) and whether the
+    case was ``"solved"``.
+    """
+    result_list = [None]*len(case_list)
+    solve_list = []
+    for i, case in enumerate(case_list):
+        partition = surrogate.partition(archive.case_inputs(case))
+        if partition is None:
+            solve_list.append(i)
+            continue
+
+        x = case_features(case)
+        prediction = partition.predict(x)
+        if any(np.max(std) > tolerance for _, std in prediction.values()):
+            solve_list.append(i)
+            continue
+
+        result = {"Mach": x[:, FEATURES.index("mach")],
+                  "AoA": x[:, FEATURES.index("alpha")], "solved": False}
+        for name, (mean, std) in prediction.items():
+            result[name] = mean
+            result[name + "_std"] = std
+        result_list[i] = result
+
+    if solve_list:
+        polar_list = solve_cases([case_list[i] for i in solve_list],
+                                 studydir, archive_dir)
+        for i, polar_dict in zip(solve_list, polar_list):
+            result = {"Mach": polar_dict["Mach"], "AoA": polar_dict["AoA"],
+                      "solved": True}
+            for name in surrogate.coefficients:
+                result[name] = polar_dict[name]
+                result[name + "_std"] = np.zeros(len(polar_dict[name]))
+            result_list[i] = result
+        surrogate.update(archive_dir, optimize=False)
+
+    return result_list
@@ -0,0 +1,158 @@
+"""Render the VSPAERO sweep AngelScript from a set of case inputs."""
+import functools
+import os
+import string
+
+from dataclasses import dataclass
+
+VSPSCRIPT = "runVSPAEROSweep.vspscript"
+
+SCRIPT_TEMPLATE = """\
+void main()
+{
+    Print( string( "-> Begin TestVSPAeroSharpTrailingEdge" ) );
+    Print( string( "" ) );
+
+    //==== Analysis: VSPAero Single Point ====//
+    string analysis_name = "VSPAEROSweep";
+    Print( analysis_name );
+
+    // Open the file
+    string fname = "$fname";
+    ReadVSPFile( fname ); // Sets VSP3 file name
+    Update();
+
+    //==== Analysis: VSPAero Compute Geometry to Create Vortex Lattice DegenGeom File ====//
+    string compgeom_name = "VSPAEROComputeGeometry";
+    Print( compgeom_name );
+
+    // Set defaults
+    SetAnalysisInputDefaults( compgeom_name );
+
+    // list inputs, type, and current values
+    PrintAnalysisInputs( compgeom_name );
+
+    // Execute
+    Print( "\\tExecuting..." );
+    string compgeom_resid = ExecAnalysis( compgeom_name );
+    Print( "COMPLETE" );
+
+    // Get & Display Results
+    PrintResults( compgeom_resid );
+
+    //==== Analysis: VSPAero Sweep ====//
+    // Set defaults
+    SetAnalysisInputDefaults( analysis_name );
+
+    // Reference geometry set
+    array< int > geom_set;
+    geom_set.push_back( 0 );
+    SetIntAnalysisInput( analysis_name, "GeomSet", geom_set, 0 );
+    array< int > ref_flag;
+    ref_flag.push_back( 1 );
+    SetIntAnalysisInput( analysis_name, "RefFlag", ref_flag, 0 );
+    array< string > wid = FindGeomsWithName( "WingGeom" );
+    SetStringAnalysisInput( analysis_name, "WingID", wid, 0 );
+
+$inputs
+    Update();
+
+    // list inputs, type, and current values
+    PrintAnalysisInputs( analysis_name );
+    Print( "" );
+
+    // Execute
+    Print( "\\tExecuting..." );
+    string rid = ExecAnalysis( analysis_name );
+    Print( "COMPLETE" );
+}
+"""
+
+INPUT_TEMPLATE = """\
+    double $var = $value;
+    array< $type > ${var}_array;
+    ${var}_array.push_back( $var );
+    Set${kind}AnalysisInput( analysis_name, "$name", ${var}_array, 0 );
+"""
+
+
+@dataclass(frozen=True)
+class SweepInput:
+    """Inputs of one VSPAEROSweep run.
+
+    `cref`, `wake_iters` and `wake_nodes` are left at the OpenVSP defaults
+    (the reference wing, 5 wake iterations and 64 wake nodes) when None.
+    A Mach sweep from `mach` to `mach_f` is only set up when `mach_npts` is
+    greater than one.
+    """
+
+    fname: str
+    alpha_i: float
+    alpha_f: float
+    alpha_npts: int
+    mach: float = 0.0
+    mach_f: float = None
+    mach_npts: int = 1
+    x_cg: float = 0.0
+    y_cg: float = 0.0
+    z_cg: float = 0.0
+    cref: float = None
+    wake_iters: int = None
+    wake_nodes: int = None
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(template):
+    return string.Template(template)
+
+
+def _input_block(var, value, name, kind="Double", type_="double"):
+    return _compile(INPUT_TEMPLATE).substitute(
+        var=var, value=value, name=name, kind=kind, type=type_)
+
+
+@functools.lru_cache(maxsize=256)
+def render(sweep_input):
+    """Return the AngelScript text of a sweep as an immutable string."""
+    freestream = "    // Freestream Parameters\n" + "\n".join([
+        _input_block("alpha_i", sweep_input.alpha_i, "AlphaStart"),
+        _input_block("alpha_f", sweep_input.alpha_f, "AlphaEnd"),
+        _input_block("alpha_npts", int(sweep_input.alpha_npts), "AlphaNpts",
+                     kind="Int", type_="int"),
+        _input_block("mach_i", sweep_input.mach, "MachStart")])
+    if sweep_input.mach_npts > 1:
+        freestream += "\n" + "\n".join([
+            _input_block("mach_f", sweep_input.mach_f, "MachEnd"),
+            _input_block("mach_npts", int(sweep_input.mach_npts), "MachNpts",
+                         kind="Int", type_="int")])
+
+    cg = "    // CG Reference Points\n" + "\n".join([
+        _input_block("x_cg", sweep_input.x_cg, "Xcg"),
+        _input_block("y_cg", sweep_input.y_cg, "Ycg"),
+        _input_block("z_cg", sweep_input.z_cg, "Zcg")])
+
+    section_list = [freestream, cg]
+    if sweep_input.cref is not None:
+        section_list.append("    // Set MGC\n" + _input_block(
+            "chord_mgc", sweep_input.cref, "cref"))
+
+    if sweep_input.wake_iters is not None:
+        section_list.append("    // Wake\n" + _input_block(
+            "wake_iters", int(sweep_input.wake_iters), "WakeNumIter",
+            kind="Int", type_="int"))
+    if sweep_input.wake_nodes is not None:
+        section_list.append(_input_block(
+            "wake_nodes", int(sweep_input.wake_nodes), "NumWakeNodes",
+            kind="Int", type_="int"))
+
+    return _compile(SCRIPT_TEMPLATE).substitute(
+        fname=sweep_input.fname, inputs="\n".join(section_list))
+
+
+def write(outputdir, sweep_input, vspscript=VSPSCRIPT):
+    """Write the rendered script into `outputdir` and return its path."""
+    scriptdir = os.path.join(outputdir, vspscript)
+    with open(scriptdir, "w") as file_object:
+        file_object.write(render(sweep_input))
+
+    return scriptdir